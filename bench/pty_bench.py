@@ -0,0 +1,413 @@
+"""
+This script measures the throughput and latency of the serial pipeline of the application on virtual serial ports, so that
+releases can be compared with each other.
+
+Two pseudo terminal pairs are connected by a wire thread that copies the bytes written to the first one into the second
+one at a configurable rate. A sending session plays a generated file into the first pair (SERIAL_THREAD1) at a nominal
+baud rate far above the rate of the wire, so that the wire and the receiving side set the pace. A receiving session,
+serviced by the serial reactor, reads the second pair, records what it receives (RECORD_THREAD) and passes it to its
+display callback. The display queue and the drawing of the user interface are not part of the measurement. For every
+scenario the script reports :
+
+    bytes_per_s  : payload bytes delivered per second, from the first byte put on the wire to the last byte received
+    callback_latency_ms : percentiles of the time from a chunk being put on the wire to its bytes reaching the display
+                          callback of the session
+    cpu_s_per_mb : CPU time of the process per megabyte of payload, without the CPU time of the wire thread and of the
+                   wait for the payload, which belong to the benchmark rather than to the pipeline
+    dropped      : bytes refused by the receive buffer, lost : bytes that never reached the receiving session
+    record_drain_s : time taken by the record thread to write out its backlog once the last byte was received
+
+The results are written as JSON. With --baseline the results are compared with those of an earlier run and the script
+exits with status 1 if a scenario has regressed by more than the tolerance.
+
+    python bench/pty_bench.py --rate 11520 0 --size 4 --output bench/results.json
+    python bench/pty_bench.py --baseline bench/results.json
+"""
+
+__author__ = "ASHUTOSH SINGH PARMAR"
+
+import argparse
+import collections
+import json
+import os
+import platform
+import select
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tty
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src'))
+
+from session import SerialSession
+
+# display options of the receiving session; the number of bytes behind a displayed text is known for these forms only
+display_options = { 'ascii' : 1, 'hex' : 2, 'none' : 0 }
+
+# bytes of text produced by the display forms for every received byte
+display_width = { 'ascii' : 1, 'hex' : 3 }
+
+# the payload is printable ASCII, so every byte is displayed as one character in the ASCII form
+payload_pattern = bytes(range(32, 127))
+
+# nominal baud rate of the sending session; SERIAL_THREAD1 paces its writes by it, so it is kept well above every rate
+# of the wire
+sender_baud = '4000000'
+
+# largest number of bytes moved by the wire thread at once
+wire_chunk_size = 4096
+
+# percentiles of the latency included in the results
+latency_percentiles = (50, 90, 99, 99.9)
+
+# time (seconds) without progress after which a scenario is considered finished
+idle_timeout = 5.0
+
+def WIRE_THREAD(wire):
+    """
+    This function runs as a separate thread. It copies the bytes written to the sending pseudo terminal into the
+    receiving one, no faster than the rate of the wire, and notes the time at which every chunk is put on the wire.
+
+    PARAMETERS
+    ----------
+    wire : dict
+    'source' and 'sink' : master file descriptors of the pseudo terminals, 'rate' : bytes per second (0 : unlimited),
+    'stamps' : deque receiving ( offset of the end of the chunk, time in nanoseconds ) tuples, 'run' : cleared to stop,
+    'cpu' : set to the CPU time (seconds) used by the thread when it stops
+
+    RETURNS
+    -------
+    NOTHING
+    """
+    moved = 0
+    start = None
+    cpu_start = time.thread_time()
+    while wire['run']:
+        ready, _, _ = select.select([wire['source']], [], [], 0.1)
+        if not ready:
+            continue
+
+        size = wire_chunk_size
+        if wire['rate'] and not start == None:
+            # only take what the wire can carry by now; the rest stays in the sender's output buffer
+            allowed = int((time.monotonic() - start) * wire['rate']) - moved
+            if allowed <= 0:
+                time.sleep(min(-allowed / wire['rate'], 0.01) + 0.0005)
+                continue
+            size = min(size, allowed)
+
+        try:
+            byts = os.read(wire['source'], size)
+        except OSError:
+            break
+        if start == None:
+            start = time.monotonic()
+            wire['start'] = time.monotonic_ns()
+
+        view = memoryview(byts)
+        while len(view):
+            view = view[os.write(wire['sink'], view):]
+        moved = moved + len(byts)
+        wire['stamps'].append( (moved, time.monotonic_ns()) )
+
+    wire['cpu'] = time.thread_time() - cpu_start
+
+def openPair():
+    """
+    This function creates a pseudo terminal pair in raw mode.
+
+    PARAMETERS
+    ----------
+    NONE
+
+    RETURNS : tuple
+    -------
+    ( master file descriptor, slave file descriptor, path of the slave )
+    """
+    master, slave = os.openpty()
+    tty.setraw(slave)
+    return (master, slave, os.ttyname(slave))
+
+def percentile(values, pct):
+    """
+    This function returns a percentile of a sorted list of values, by the nearest rank.
+
+    PARAMETERS
+    ----------
+    values : list
+    Sorted values
+
+    pct : float
+    The percentile
+
+    RETURNS : float
+    -------
+    The percentile, or None if there are no values
+    """
+    if len(values) == 0:
+        return None
+    rank = min(max(int(round(pct / 100 * len(values) + 0.5)) - 1, 0), len(values) - 1)
+    return values[rank]
+
+def runScenario(rate, size, display, csv, spill):
+    """
+    This function sends a payload through the pipeline once and measures it.
+
+    PARAMETERS
+    ----------
+    rate : int
+    Rate of the wire in bytes per second; 0 : unlimited
+
+    size : int
+    Number of payload bytes
+
+    display : str
+    Display form of the receiving session; a key of display_options
+
+    csv, spill : bool
+    Whether the receiving session records in csv form as well, and spills receive buffer overflow to disk
+
+    RETURNS : dict
+    -------
+    The results of the scenario
+    """
+    workspace = tempfile.mkdtemp(prefix='terman_bench_')
+    pairs = [openPair(), openPair()]
+    wire = { 'source' : pairs[0][0], 'sink' : pairs[1][0], 'rate' : rate, 'stamps' : collections.deque(), 'run' : 1, 'start' : None, 'cpu' : 0 }
+    events = { 'started' : threading.Semaphore(0), 'stopped' : threading.Semaphore(0) }
+    latencies = []
+    displayed = [0]
+
+    try:
+        play_file = os.path.join(workspace, 'payload.bin')
+        with open(play_file, 'wb') as fl:
+            fl.write((payload_pattern * (size // len(payload_pattern) + 1))[:size])
+
+        def started(thread):
+            events['started'].release()
+
+        def stopped(thread, err):
+            events['stopped'].release()
+
+        receiver = SerialSession()
+        receiver.port = pairs[1][2]
+        receiver.baud = '115200'
+        receiver.workspace = workspace
+        receiver.record_name = 'received'
+        receiver.record = 1
+        receiver.record_csv = 1 if csv else 0
+        receiver.spill_overflow = 1 if spill else 0
+        receiver.display_option = display_options[display]
+        receiver.on_started = started
+        receiver.on_stopped = stopped
+
+        if display in display_width:
+            def show(text):
+                now = time.monotonic_ns()
+                displayed[0] = displayed[0] + len(text) // display_width[display]
+                stamps = wire['stamps']
+                while len(stamps) and stamps[0][0] <= displayed[0]:
+                    latencies.append(now - stamps.popleft()[1])
+            receiver.on_display = show
+
+        sender = SerialSession()
+        sender.port = pairs[0][2]
+        sender.baud = sender_baud
+        sender.workspace = "none"
+        sender.display_option = 0
+        sender.on_started = started
+        sender.on_stopped = stopped
+
+        receiver.connect()
+        if not events['started'].acquire(timeout=idle_timeout):
+            raise RuntimeError("could not connect to " + receiver.port)
+
+        wire_thread = threading.Thread(target=WIRE_THREAD, args=(wire,), daemon=True)
+        wire_thread.start()
+
+        cpu_start = time.process_time()
+        sender.play(play_file, 0)
+
+        # wait until every byte has reached the receiving session, or until it stops making progress
+        wait_cpu_start = time.thread_time()
+        received = 0
+        last_progress = time.monotonic()
+        end = time.monotonic_ns()
+        while received < size and time.monotonic() - last_progress < idle_timeout:
+            time.sleep(0.005)
+            count = receiver.receive_count + receiver.receive_buff.dropped
+            if count > received:
+                received = count
+                end = time.monotonic_ns()
+                last_progress = time.monotonic()
+        wait_cpu = time.thread_time() - wait_cpu_start
+
+        sender.stopPlay()
+        receiver.disconnect()
+        for _ in range(2):
+            events['stopped'].acquire(timeout=idle_timeout)
+
+        # closing the session waits for the record thread to write out its backlog
+        drain_start = time.monotonic()
+        receiver.close(remove_records=False)
+        record_drain = time.monotonic() - drain_start
+        sender.close()
+        cpu = time.process_time() - cpu_start
+
+        wire['run'] = 0
+        wire_thread.join()
+
+        # the CPU time of the benchmark's own threads is not part of the pipeline
+        cpu = max(cpu - wire['cpu'] - wait_cpu, 0)
+
+        recorded = 0
+        for segment in receiver.recordSegments():
+            recorded = recorded + os.path.getsize(segment + '.bin')
+
+        stats = receiver.bufferStats()
+        elapsed = (end - wire['start']) / 1e9 if not wire['start'] == None else 0
+        latencies.sort()
+        result = {
+            'name' : "rate=%s display=%s csv=%d spill=%d" % (rate if rate else 'max', display, 1 if csv else 0, 1 if spill else 0),
+            'rate' : rate,
+            'size' : size,
+            'display' : display,
+            'csv' : bool(csv),
+            'spill' : bool(spill),
+            'received' : received,
+            'recorded' : recorded,
+            'duration_s' : elapsed,
+            'bytes_per_s' : received / elapsed if elapsed else None,
+            'callback_latency_ms' : None,
+            'cpu_s_per_mb' : cpu / (size / 1e6),
+            'dropped' : stats['receive']['dropped'],
+            'lost' : size - received,
+            'receive_high_water' : stats['receive']['high_water'],
+            'spilled' : stats['spill']['total'],
+            'record_drain_s' : record_drain,
+        }
+        if len(latencies):
+            result['callback_latency_ms'] = { 'p' + str(pct) : percentile(latencies, pct) / 1e6 for pct in latency_percentiles }
+            result['callback_latency_ms']['max'] = latencies[-1] / 1e6
+        return result
+
+    finally:
+        wire['run'] = 0
+        for master, slave, path in pairs:
+            os.close(master)
+            os.close(slave)
+        shutil.rmtree(workspace, ignore_errors=True)
+
+def compare(results, baseline, tolerance):
+    """
+    This function compares the results of a run with those of an earlier run.
+
+    PARAMETERS
+    ----------
+    results, baseline : dict
+    The results of the two runs
+
+    tolerance : float
+    Relative change of a measurement that is accepted
+
+    RETURNS : list
+    -------
+    Descriptions of the regressions found
+    """
+    regressions = []
+    earlier = { scenario['name'] : scenario for scenario in baseline.get('scenarios', []) }
+    for scenario in results['scenarios']:
+        old = earlier.get(scenario['name'])
+        if old == None:
+            continue
+        name = scenario['name']
+
+        if old['bytes_per_s'] and scenario['bytes_per_s'] and scenario['bytes_per_s'] < old['bytes_per_s'] * (1 - tolerance):
+            regressions.append("%s : throughput %.0f B/s, was %.0f B/s" % (name, scenario['bytes_per_s'], old['bytes_per_s']))
+
+        latency = scenario['callback_latency_ms']
+        old_latency = old.get('callback_latency_ms')
+        if old_latency and latency:
+            for key in ('p50', 'p99'):
+                if key in old_latency and latency[key] > old_latency[key] * (1 + tolerance):
+                    regressions.append("%s : %s callback latency %.3f ms, was %.3f ms" % (name, key, latency[key], old_latency[key]))
+
+        if scenario['cpu_s_per_mb'] > old['cpu_s_per_mb'] * (1 + tolerance):
+            regressions.append("%s : cpu %.3f s/MB, was %.3f s/MB" % (name, scenario['cpu_s_per_mb'], old['cpu_s_per_mb']))
+
+        if scenario['dropped'] + scenario['lost'] > old['dropped'] + old['lost']:
+            regressions.append("%s : %d bytes dropped or lost, was %d" % (name, scenario['dropped'] + scenario['lost'], old['dropped'] + old['lost']))
+
+    return regressions
+
+def main(argv=None):
+    """
+    This function runs the scenarios described by the command line arguments.
+
+    PARAMETERS
+    ----------
+    argv : list
+    The command line arguments; sys.argv is used if None
+
+    RETURNS : int
+    -------
+    The exit status : 0 on success, 1 if a regression was found
+    """
+    parser = argparse.ArgumentParser(description="Throughput and latency benchmark of the TerMAN serial pipeline on pseudo terminals.")
+    parser.add_argument('--rate', type=int, nargs='+', default=[11520, 0], metavar='BYTES_PER_S',
+                        help="rates of the wire to benchmark; 0 is unlimited (default: 11520 0)")
+    parser.add_argument('--size', type=float, default=1, metavar='MB', help="payload of every scenario in megabytes (default: 1)")
+    parser.add_argument('--duration', type=float, default=5, metavar='SECONDS',
+                        help="limits the payload of rate limited scenarios to this many seconds of traffic (default: 5)")
+    parser.add_argument('--display', choices=sorted(display_options), nargs='+', default=['ascii'],
+                        help="display forms of the receiving session to benchmark (default: ascii)")
+    parser.add_argument('--csv', action='store_true', help="record in csv form as well")
+    parser.add_argument('--spill', action='store_true', help="spill receive buffer overflow to disk")
+    parser.add_argument('--output', metavar='FILE', help="file the results are written to as JSON")
+    parser.add_argument('--baseline', metavar='FILE', help="results of an earlier run to compare with")
+    parser.add_argument('--tolerance', type=float, default=0.2, help="relative change accepted by the comparison (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    results = {
+        'time' : datetime.now().isoformat(timespec='seconds'),
+        'python' : platform.python_version(),
+        'platform' : platform.platform(),
+        'scenarios' : [],
+    }
+
+    for display in args.display:
+        for rate in args.rate:
+            size = int(args.size * 1e6)
+            if rate:
+                size = min(size, int(rate * args.duration))
+            scenario = runScenario(rate, size, display, args.csv, args.spill)
+            results['scenarios'].append(scenario)
+
+            latency = "-"
+            if not scenario['callback_latency_ms'] == None:
+                latency = "callback p50 %.3f ms, p99 %.3f ms" % (scenario['callback_latency_ms']['p50'], scenario['callback_latency_ms']['p99'])
+            print("%s : %.0f B/s, %s, %.3f cpu s/MB, dropped %d, lost %d" % (scenario['name'], scenario['bytes_per_s'] or 0,
+                  latency, scenario['cpu_s_per_mb'], scenario['dropped'], scenario['lost']), file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if args.output == None:
+        print(text)
+    else:
+        with open(args.output, 'w') as fl:
+            fl.write(text + '\n')
+
+    if not args.baseline == None:
+        with open(args.baseline) as fl:
+            regressions = compare(results, json.load(fl), args.tolerance)
+        for regression in regressions:
+            print("Regression : " + regression, file=sys.stderr)
+        if len(regressions):
+            return 1
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
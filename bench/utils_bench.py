@@ -0,0 +1,306 @@
+"""
+This script times the helpers of utility/utils.py that every received or sent byte passes through, over input sizes from
+1 byte to 10 megabytes, and reports how their cost grows with the size of the input.
+
+For every function the time per call is measured at each size (the median of several repeats, each running the function
+for at least a minimum time, so that a single disturbed repeat does not bend the curve), and the slope of log(time)
+against log(size) is fitted over the sizes large enough for the fixed cost of a call to be negligible. A linear function
+has a slope close to 1; a function whose slope exceeds 1 by more than the tolerance is flagged and the script exits with
+status 1. A size is skipped once a single call of a function has taken longer than the call budget, which is itself
+reported as a sign of super linear growth.
+
+    python bench/utils_bench.py --output bench/utils_results.json --plot bench/utils_scaling.png
+"""
+
+__author__ = "ASHUTOSH SINGH PARMAR"
+
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import sys
+import time
+import types
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src'))
+
+from utility import utils
+
+# length of the lines of the csv benchmark, in bytes
+csv_line_length = 64
+
+def benchBuffer(size):
+    """
+    This function prepares the benchmark of a round trip through the receive buffer : enqueue followed by dequeue.
+    """
+    buff = utils.buffer(size)
+    data = bytes(size)
+    def call():
+        buff.enqueue(data)
+        buff.dequeue(size)
+    return call
+
+def benchHexString(size):
+    """
+    This function prepares the benchmark of convertToHexString, as used by the HEX display.
+    """
+    data = bytes(range(256)) * (size // 256 + 1)
+    data = data[:size]
+    return lambda: utils.convertToHexString(data)
+
+def benchByteString(size):
+    """
+    This function prepares the benchmark of convertToByteString on the text typed into the send area for size bytes.
+    """
+    text = utils.convertToHexString(bytes(range(256)) * (size // 256 + 1))[:size * 3]
+    return lambda: utils.convertToByteString(text)
+
+def benchCSV(size):
+    """
+    This function prepares the benchmark of convertToCSV on size bytes of lines.
+    """
+    stamp = datetime.now()
+    line = 'x' * (csv_line_length - 1)
+    data = [ (stamp, line) for i in range(max(size // csv_line_length, 1)) ]
+    session = types.SimpleNamespace(csv_index=0)
+    return lambda: utils.convertToCSV(session, data)
+
+def benchHexDump(size):
+    """
+    This function prepares the benchmark of hexDumper.format, as used by the HEX DUMP display.
+    """
+    dumper = utils.hexDumper()
+    data = bytes(range(256)) * (size // 256 + 1)
+    data = data[:size]
+    return lambda: dumper.format(data)
+
+def benchDecode(size):
+    """
+    This function prepares the benchmark of textDecoder.decode, as used by the ASCII display.
+    """
+    decoder = utils.textDecoder()
+    data = bytes(range(256)) * (size // 256 + 1)
+    data = data[:size]
+    return lambda: decoder.decode(data)
+
+# the benchmarked functions and the functions preparing a call of them for an input size
+benchmarks = {
+    'buffer.enqueue/dequeue' : benchBuffer,
+    'convertToHexString' : benchHexString,
+    'convertToByteString' : benchByteString,
+    'convertToCSV' : benchCSV,
+    'hexDumper.format' : benchHexDump,
+    'textDecoder.decode' : benchDecode,
+}
+
+def getSizes(smallest, largest, steps):
+    """
+    This function returns input sizes spaced evenly on a logarithmic scale.
+
+    PARAMETERS
+    ----------
+    smallest, largest : int
+    The first and the last size
+
+    steps : int
+    Number of sizes per decade
+
+    RETURNS : list
+    -------
+    The sizes in increasing order
+    """
+    sizes = []
+    count = int(round(math.log10(largest / smallest) * steps))
+    for i in range(count + 1):
+        size = int(round(smallest * 10 ** (i / steps)))
+        if len(sizes) == 0 or size > sizes[-1]:
+            sizes.append(size)
+    return sizes
+
+def timeCall(call, min_time, repeat):
+    """
+    This function measures the time taken by a call.
+
+    PARAMETERS
+    ----------
+    call : function
+    The function to be timed
+
+    min_time : float
+    Minimum time (seconds) for which the function is run in every repeat
+
+    repeat : int
+    Number of repeats
+
+    RETURNS : float
+    -------
+    The median time per call in seconds
+    """
+    # a first call gives the number of calls that fill the minimum time
+    start = time.perf_counter()
+    call()
+    first = time.perf_counter() - start
+    number = max(int(min_time / max(first, 1e-9)), 1)
+
+    times = []
+    for _ in range(max(repeat, 1)):
+        start = time.perf_counter()
+        for _ in range(number):
+            call()
+        times.append( (time.perf_counter() - start) / number )
+    return statistics.median(times)
+
+def fitSlope(points):
+    """
+    This function fits a line to points in log-log space by least squares.
+
+    PARAMETERS
+    ----------
+    points : list
+    ( size, seconds ) tuples
+
+    RETURNS : float
+    -------
+    The slope of the line, or None if there are less than two points
+    """
+    if len(points) < 2:
+        return None
+    xs = [ math.log(size) for size, seconds in points ]
+    ys = [ math.log(seconds) for size, seconds in points ]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    covariance = sum( (x - mean_x) * (y - mean_y) for x, y in zip(xs, ys) )
+    variance = sum( (x - mean_x) ** 2 for x in xs )
+    return covariance / variance
+
+def plot(results, file_name):
+    """
+    This function plots the time per byte of the benchmarked functions against the input size; it needs matplotlib.
+
+    PARAMETERS
+    ----------
+    results : dict
+    The results of the run
+
+    file_name : str
+    File the plot is saved to
+
+    RETURNS : bool
+    -------
+    False if matplotlib is not available
+    """
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except ImportError:
+        return False
+
+    fig, ax = plt.subplots(figsize=(9, 6))
+    for name, result in results['functions'].items():
+        sizes = [ point['size'] for point in result['points'] ]
+        per_byte = [ point['seconds'] / point['size'] * 1e9 for point in result['points'] ]
+        label = name if result['slope'] == None else "%s (slope %.2f)" % (name, result['slope'])
+        ax.plot(sizes, per_byte, marker='o', label=label)
+    ax.set_xscale('log')
+    ax.set_yscale('log')
+    ax.set_xlabel("input size (bytes)")
+    ax.set_ylabel("time per byte (ns)")
+    ax.set_title("Scaling of the utility functions; flat lines are linear")
+    ax.grid(True, which='both', alpha=0.3)
+    ax.legend()
+    fig.savefig(file_name, dpi=100, bbox_inches='tight')
+    plt.close(fig)
+    return True
+
+def main(argv=None):
+    """
+    This function runs the benchmarks described by the command line arguments.
+
+    PARAMETERS
+    ----------
+    argv : list
+    The command line arguments; sys.argv is used if None
+
+    RETURNS : int
+    -------
+    The exit status : 0 on success, 1 if a function grows worse than linearly or the plot could not be made
+    """
+    parser = argparse.ArgumentParser(description="Scaling benchmark of the TerMAN utility functions.")
+    parser.add_argument('--function', choices=sorted(benchmarks), nargs='+', help="functions to benchmark (default: all)")
+    parser.add_argument('--min-size', type=int, default=1, metavar='BYTES', help="smallest input size (default: 1)")
+    parser.add_argument('--max-size', type=int, default=10000000, metavar='BYTES', help="largest input size (default: 10000000)")
+    parser.add_argument('--steps', type=int, default=2, help="input sizes per decade (default: 2)")
+    parser.add_argument('--fit-from', type=int, default=100000, metavar='BYTES',
+                        help="smallest size used to fit the growth, below it the fixed cost of a call and the caches dominate (default: 100000)")
+    parser.add_argument('--min-time', type=float, default=0.05, metavar='SECONDS', help="minimum time of every repeat (default: 0.05)")
+    parser.add_argument('--repeat', type=int, default=5, help="repeats per size, the median is kept (default: 5)")
+    parser.add_argument('--call-budget', type=float, default=2.0, metavar='SECONDS',
+                        help="larger sizes are skipped once a single call takes longer than this (default: 2)")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="accepted excess of the slope over 1 (default: 0.25)")
+    parser.add_argument('--output', metavar='FILE', help="file the results are written to as JSON")
+    parser.add_argument('--plot', metavar='FILE', help="file a log-log plot of the results is saved to; needs matplotlib")
+    args = parser.parse_args(argv)
+
+    names = args.function
+    if names == None:
+        names = list(benchmarks)
+    sizes = getSizes(args.min_size, args.max_size, args.steps)
+
+    results = {
+        'time' : datetime.now().isoformat(timespec='seconds'),
+        'python' : platform.python_version(),
+        'platform' : platform.platform(),
+        'tolerance' : args.tolerance,
+        'functions' : {},
+    }
+    flagged = []
+
+    for name in names:
+        points = []
+        skipped = []
+        for size in sizes:
+            if len(points) and points[-1]['seconds'] > args.call_budget:
+                skipped.append(size)
+                continue
+            call = benchmarks[name](size)
+            points.append({ 'size' : size, 'seconds' : timeCall(call, args.min_time, args.repeat) })
+            del call
+
+        slope = fitSlope([ (point['size'], point['seconds']) for point in points if point['size'] >= args.fit_from ])
+        linear = not (not slope == None and slope > 1 + args.tolerance)
+        results['functions'][name] = { 'points' : points, 'skipped' : skipped, 'slope' : slope, 'linear' : linear }
+
+        parts = []
+        if not slope == None:
+            parts.append("slope %.2f" % slope)
+        if len(points):
+            parts.append("%.1f ns/B at %d bytes" % (points[-1]['seconds'] / points[-1]['size'] * 1e9, points[-1]['size']))
+        if len(skipped):
+            parts.append("skipped %d sizes over the call budget" % len(skipped))
+        text = "%-24s %s" % (name, ", ".join(parts))
+        if not linear:
+            text = text + " : WORSE THAN LINEAR"
+            flagged.append(name)
+        print(text, file=sys.stderr)
+
+    text = json.dumps(results, indent=2)
+    if args.output == None:
+        print(text)
+    else:
+        with open(args.output, 'w') as fl:
+            fl.write(text + '\n')
+
+    status = 0
+    if not args.plot == None and not plot(results, args.plot):
+        print("Error : matplotlib is required for --plot", file=sys.stderr)
+        status = 1
+    if len(flagged):
+        status = 1
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
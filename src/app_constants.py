@@ -43,6 +43,9 @@ stop_bits_menu_width = 10
 # width of the connect/disconnect button
 connection_button_width = 20
 
+# width of the new tab and close tab buttons
+tab_button_width = 10
+
 #---------------------------------------------------------------------------------------------------------------------------
 
 
@@ -55,12 +58,23 @@ connection_button_width = 20
 # width of the save as button
 save_button_width = 10
 
+# length (pixels) of the progress bar shown while record files are saved
+save_progress_length = 100
+
 # width of the play button
 play_button_width = 10
 
 # width of the play file select drop down menu
 play_file_menu_width = 20
 
+# lowest and highest speed factors of a timed replay
+min_replay_speed = 0.1
+max_replay_speed = 100.0
+
+# choices of the replay timing drop down menu; 'delay' sends the bytes at the delay given in the delay box, 'max' sends
+# the file as fast as possible, the others replay the recorded timing sped up by the given factor
+replay_timing_list = ['delay', '0.1x', '0.5x', '1x', '2x', '5x', '10x', '100x', 'max']
+
 #--------------------------------------------------------------------------------------------------------------------------
 
 
@@ -85,6 +99,36 @@ display_font = "Arial"
 # font size of text in the display area
 display_font_size = 13
 
+# number of bytes per row in the HEX DUMP display mode
+hex_dump_row_width = 16
+
+# handling of received bytes that are not valid UTF-8 : 'replace', 'escape' (shown as \xNN) or 'latin-1'
+default_decode_errors = 'replace'
+
+# width of the drop down menu for selecting the handling of invalid UTF-8
+decode_errors_menu_width = 10
+
+# width of the history button
+history_button_width = 20
+
+# maximum number of lines kept in the display area; older lines are moved to the scrollback history
+display_scrollback_lines = 5000
+
+# maximum number of characters kept in the display area; older text is moved to the scrollback history
+display_scrollback_chars = 500000
+
+# maximum number of lines kept in the scrollback history; the oldest lines are discarded beyond this
+scrollback_history_lines = 200000
+
+# maximum number of characters kept in the scrollback history; the oldest lines are discarded beyond this
+scrollback_history_chars = 20000000
+
+# lines of the scrollback history longer than this are stored as several lines, e.g. the text of the HEX display
+scrollback_line_width = 1024
+
+# number of lines shown per page in the history window
+history_page_lines = 500
+
 #-------------------------------------------------------------------------------------------------------------------------
 
 
@@ -112,8 +156,18 @@ display_text_color = "#0000ff"
 # interval at which ports menu and record file menu are updated
 update_interval = 5
 
+# interval (milliseconds) at which the main thread applies the port and play file lists enumerated in the background
+maintenance_poll_interval = 250
+
 record_thread_interval = 0.01
 
+# interval (milliseconds) at which pending received data is drawn in the display area; 33 ms gives about 30 frames/s
+display_frame_interval = 33
+
+# maximum number of received characters waiting to be drawn in the display area of a tab; further text is dropped, and
+# counted, until the main thread catches up
+display_queue_chars = 4000000
+
 #------------------------------------------------------------------------------------------------------------------------
 
 
@@ -123,10 +177,57 @@ record_thread_interval = 0.01
 #------------------------------------------------------------------------------------------------------------------------
 # BUFFER SIZES
 
-binary_record_buffer_size = 20000
+# size of the write buffer of each record file
+record_buffer_size = 65536
 
-receive_buffer_size = 2000
+# size of the receive buffer of each session; it has to hold several reads of the port while the record thread writes
+receive_buffer_size = 65536
 
 send_buffer_size = 2000
 
+#------------------------------------------------------------------------------------------------------------------------
+
+
+
+
+
+#------------------------------------------------------------------------------------------------------------------------
+# RECORDING
+
+# pending record data is written to the record file once this many bytes have accumulated
+record_flush_size = 32768
+
+# pending record data is written to the record file once it is this many seconds old
+record_flush_age = 1.0
+
+# if True, every write to a record file is committed to the disk (fsync); safer but slower
+record_fsync = False
+
+# maximum time (seconds) spent writing out the receive buffer when the record files are closed
+record_close_timeout = 1.0
+
+# if 1, received bytes that do not fit into the full receive buffer are kept in a temporary file until they are recorded
+spill_overflow = 0
+
+# maximum number of bytes the record thread takes out of the spill file at a time
+spill_read_size = 1048576
+
+# minimum time (seconds) between two entries of the time index of a recording container
+record_index_interval = 1.0
+
+# size (bytes) at which the record files are closed and a new segment is started; 0 for no limit
+record_segment_size = 512 * 1024 * 1024
+
+# time (seconds) after which the record files are closed and a new segment is started; 0 for no limit
+record_segment_time = 0
+
+# number of most recent segments kept; older segments are deleted. 0 keeps all the segments
+record_segment_keep = 0
+
+# interval (milliseconds) at which the status bar shows the metrics of the selected session
+status_bar_interval = 1000
+
+# interval (seconds) at which the metrics are written to the --metrics file or socket
+metrics_interval = 1.0
+
 #------------------------------------------------------------------------------------------------------------------------
\ No newline at end of file
@@ -6,19 +6,21 @@ __author__ = "ASHUTOSH SINGH PARMAR"
 
 import os
 import time
-from datetime import datetime
+from collections import deque
 import threading
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
-from utility import serial_utility, os_utility, utils
+from utility import serial_utility, os_utility, record_utility, metrics_utility, utils
+from session import SerialSession
 import app_constants as appconst
 
 
-def RECORD_THREAD(app):
+def MAINTENANCE_THREAD(app):
     """
     This function is a part of application logic and runs as a separate thread.
-    The tasks performed by this thread are :
+    It periodically enumerates the available serial ports and the play files in the workspace. Both can be slow, so they
+    are kept off the main thread and the record thread; the results are handed to the main thread, which updates the menus.
 
     PARAMETERS
     ----------
@@ -28,63 +30,275 @@ def RECORD_THREAD(app):
     -------
     NOTHING
     """
-    start_time = datetime.now()
-
-    # All the thread4 logic goes in here
     while True:
+        time.sleep(appconst.update_interval)
+
+        try:
+            ports_list = serial_utility.getPorts()
+            files_list = os_utility.filesInWorkspace()
+        except Exception as e:
+            print('Error : ', e)
+            continue
+
+        app.maintenance_results.append( (ports_list, files_list) )
+
+
+def SAVE_THREAD(app, jobs):
+    """
+    This function is a part of application logic and runs as a separate thread.
+    It copies record files for the 'save as' button, reporting the progress to the main thread.
+
+    PARAMETERS
+    ----------
+    app : tkinter object
+
+    jobs : list
+    A tuple ( source, destination, size ) for every file to be copied; only the first size bytes of the source are copied
+
+    RETURNS
+    -------
+    NOTHING
+    """
+    total = max(sum(job[2] for job in jobs), 1)
+    done = 0
+    shown = [ -1 ]
+
+    def progress(copied):
+        # the main thread is only informed when the shown percentage changes
+        percent = (done + copied) * 100 // total
+        if not percent == shown[0]:
+            shown[0] = percent
+            app.callInMainThread(app.saveProgressClbk, percent)
+
+    err = None
+    try:
+        for source, destination, size in jobs:
+            os_utility.copyFile(source, destination, size, progress)
+            done = done + size
+    except Exception as e:
+        err = str(e)
+
+    app.callInMainThread(app.saveFinishedClbk, err)
+
+
+class SessionPane:
+    """
+    This class associates a serial session with its display pane : a tab of the display notebook holding a text box. The
+    text received by the session is queued by the serial threads and drawn by the main thread, and the text box is kept
+    within the configured scrollback limits.
+
+    Attributes
+    ----------
+    session : SerialSession
+    The session shown in the pane
+
+    state : str
+    'idle', 'connecting', 'connected', 'starting' (playback requested) or 'playing'
 
-        if app.receive_buff.filled:
-            # Dequeue one byte at a time
-            byt = app.receive_buff.dequeue(1)
+    display : tk.Text
+    The text box of the pane
 
-            # If the binary record option is enabled
-            if app.recordAsCSV():
+    scrollback : utils.scrollbackStore
+    The text trimmed from the top of the text box
+    """
+
+    def __init__(self, notebook, session):
+        """
+        Class constructor; it creates the tab of the pane in the notebook.
+
+        PARAMETERS
+        ----------
+        notebook : ttk.Notebook
+        The display notebook
+
+        session : SerialSession
+        The session shown in the pane
+        """
+        self.session = session
+        self.state = 'idle'
+
+        self.frame = tk.Frame(notebook)
+        self.display = tk.Text(self.frame, bg=appconst.display_color, fg=appconst.display_text_color, xscrollcommand=False, yscrollcommand=True, width=appconst.entry_width + 20)
+        self.display.configure(font=(appconst.display_font, appconst.display_font_size))
+        self.display.pack(expand=1, fill=tk.X, padx=5, pady=5)
+
+        # text received by the serial threads waiting to be drawn by the main thread, the most characters it has held and
+        # the characters dropped because it was full. The characters queued are counted by the serial threads and the
+        # characters drawn by the main thread, so each counter is only incremented by one thread
+        self.display_queue = deque()
+        self.display_queued_chars = 0
+        self.display_drawn_chars = 0
+        self.display_queue_peak = 0
+        self.display_dropped = 0
+
+        # statistics of the last playback of the session, shown in the status bar; None until a playback has ended
+        self.play_report = None
+
+        # text trimmed from the top of the display box is kept here
+        self.scrollback = utils.scrollbackStore(appconst.scrollback_history_lines, appconst.scrollback_history_chars, appconst.scrollback_line_width)
+        self.display_chars = 0
 
-                # If newline is detected then, append a tuple to the csv list option
-                if byt == b'\x0a':
-                    _data = app.csv_data_var
-                    app.csv_data_var = b''
-                    if not len(_data)==0:
-                        try:
-                            app.recorded_csv_list.append( (datetime.now(), _data.decode()) )
-                        except:
-                            pass
+        self.session.on_display = self.queueForDisplay
 
-                # Otherwise append data to csv_data_var variable
-                else:
-                    app.csv_data_var = app.csv_data_var + byt
+    def isBusy(self):
+        """
+        This method returns whether the session of the pane is connected, playing or about to be.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : bool
+        -------
+        True if the session is not idle
+        """
+        return not self.state == 'idle'
 
-            app.recorded_data.enqueue(byt)
+    def queueForDisplay(self, text):
+        """
+        This method queues text to be appended to the text box. Unlike putOnDisplay() it is safe to call from any
+        thread; the queued text is drawn by the main thread in the next display frame. If the main thread has fallen
+        display_queue_chars characters behind, the text is dropped and counted instead.
 
+        PARAMETERS
+        ----------
+        text : str
+        The text to be displayed
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        if self.display_queued_chars - self.display_drawn_chars + len(text) > appconst.display_queue_chars:
+            self.display_dropped = self.display_dropped + len(text)
+            return
+        self.display_queue.append(text)
+        self.display_queued_chars = self.display_queued_chars + len(text)
+
+    def drawPending(self):
+        """
+        This method joins all the queued text and draws it with a single insert followed by a single scroll. It must be
+        called on the main thread.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        waiting = self.display_queued_chars - self.display_drawn_chars
+        if waiting > self.display_queue_peak:
+            self.display_queue_peak = waiting
+        count = len(self.display_queue)
+        if count:
+            text = "".join([ self.display_queue.popleft() for i in range(count) ])
+            self.display_drawn_chars = self.display_drawn_chars + len(text)
+            self.putOnDisplay(text)
+            self.scroll()
+
+    def metrics(self):
+        """
+        This method returns the runtime metrics of the session of the pane along with the depth of its display queue; it
+        is safe to call from any thread.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : dict
+        -------
+        The metrics returned by SerialSession.metrics(), with 'display_queue' : the number of characters waiting to be
+        drawn, 'display_queue_peak' : the most characters that have waited and 'display_dropped' : the characters dropped
+        because the queue was full, 'play_report' : the statistics of the last playback, or None
+        """
+        metrics = self.session.metrics()
+        metrics['display_queue'] = self.display_queued_chars - self.display_drawn_chars
+        metrics['display_queue_peak'] = self.display_queue_peak
+        metrics['display_dropped'] = self.display_dropped
+        metrics['play_report'] = self.play_report
+        return metrics
+
+    def scroll(self):
+        """
+        This method scrolls the text box to its end.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.display.see(tk.END)
+
+    def clearDisplay(self):
+        """
+        This method clears the text box and its scrollback history.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.display.delete( '1.0', 'end')
+        self.scrollback.flush()
+        self.display_chars = 0
+
+    def putOnDisplay(self, text):
+        """
+        This function appends text to the text box.
+
+        PARAMETERS
+        ----------
+        text : str
+        The text to be displayed
 
-        now = datetime.now()
-        if (now-start_time).total_seconds() >= appconst.update_interval:
-            start_time = now
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.display.insert(tk.END, text)
+        self.display_chars = self.display_chars + len(text)
+        self.__trimDisplay()
 
-            # Update the list of available ports
-            app.updatePortsMenu()
+    def __trimDisplay(self):
+        """
+        This private method keeps the text box within the configured number of lines and characters. The text above
+        the limit is moved into the scrollback history; a tenth of the limit is trimmed in excess so that trimming does not
+        happen on every frame.
 
-            # Update the play file menu
-            app.updatePlayFileMenu()
+        PARAMETERS
+        ----------
+        NONE
 
-            # See if there is any recording data in the record buffer. If there is some then transfer it to the record file.
-            avl = app.recorded_data.filled
-            if avl:
-                if not app.record_file_name == "":
-                    with open(app.record_file_name, 'ab') as fl:
-                        fl.write( app.recorded_data.dequeue(avl) )
+        RETURNS
+        -------
+        NOTHING
+        """
+        lines = int(self.display.index('end-1c').split('.')[0])
+        if lines <= appconst.display_scrollback_lines and self.display_chars <= appconst.display_scrollback_chars:
+            return
 
-            # See if there is any recording data in the csv record buffer. If there is some then transfer it to the record file.
-            avl = len(app.recorded_csv_list)
-            if avl:
-                if not app.csv_record_file_name=="":
-                    lst = app.recorded_csv_list[ 0 : avl ]
-                    del app.recorded_csv_list[ 0 : avl]
-                    csv_str=utils.convertToCSV(app, lst)
-                    with open( app.csv_record_file_name, 'a') as fl:
-                        fl.write(csv_str)
+        cut = '1.0'
+        excess = lines - appconst.display_scrollback_lines * 9 // 10
+        if excess > 0:
+            cut = '%d.0' % (excess + 1)
+        excess = self.display_chars - appconst.display_scrollback_chars * 9 // 10
+        if excess > 0:
+            cut_chars = self.display.index('1.0 + %d chars' % excess)
+            if self.display.compare(cut_chars, '>', cut):
+                cut = cut_chars
 
-        time.sleep(appconst.record_thread_interval)
+        text = self.display.get('1.0', cut)
+        self.display.delete('1.0', cut)
+        self.scrollback.append(text)
+        self.display_chars = self.display_chars - len(text)
 
 
 class App:
@@ -94,9 +308,18 @@ class App:
 
 #----------------------------------------------------------------------------------------------------------------------------
 # CONSTRUCTOR AND OTHER METHODS
-    def __init__(self):
+    def __init__(self, metrics_target=None, metrics_interval=appconst.metrics_interval):
         """
         Class constructor; it builds the user interface by invoking various private member methods.
+
+        PARAMETERS
+        ----------
+        metrics_target : str
+        If given, the metrics of the sessions are written periodically to this file or socket (see
+        utility.metrics_utility.metricsPublisher)
+
+        metrics_interval : float
+        Time (seconds) between two updates of the metrics target
         """
 
         #CREATE THE MAIN WINDOW FOR THE APPLICATION
@@ -112,31 +335,38 @@ class App:
         #CREATE THE PORT SEGMENT
         self.__createPortsSegment()
 
+        #CREATE THE STATUS BAR; it is packed before the segments below it so that it spans the whole window
+        self.__createStatusBar()
+
         #CREATE THE LEFT SEGMENT
         self.__createLeftSegment()
 
         #CREATE THE RIGHT SEGMENT
         self.__createRightSegment()
 
-        # SERIAL UTILITY THREAD OBJECTS
-        self.serial_thread0=None
-        self.serial_thread1=None
-
-        # CREATE BUFFERS AND OTHER VARIABLES
-        self.receive_buff = utils.buffer(appconst.receive_buffer_size)
-        self.send_buff = utils.buffer(appconst.send_buffer_size)
-        self.recorded_data = utils.buffer(appconst.binary_record_buffer_size)
-        self.recorded_csv_list = []
-        self.csv_data_var = b''
-        self.csv_index = 0
-
-        #file name of the temporary record file
-        self.record_file_name = ""
-        self.csv_record_file_name = ""
-
-        #LAUNCH THE THREADS
-        self.record_thread=threading.Thread(target = RECORD_THREAD, args=(self,), daemon=True)
-        self.record_thread.start()
+        # functions queued by other threads to be run on the main thread
+        self.main_thread_calls = deque()
+
+        # SERIAL, RECORDING AND PLAYBACK LOGIC; one session per tab of the display notebook
+        self.panes = []
+        self.pane = None
+        self.addPane()
+
+        # lists of ports and play files enumerated by the maintenance thread, waiting to be applied by the main thread
+        self.maintenance_results = deque()
+        self.maintenance_thread=threading.Thread(target = MAINTENANCE_THREAD, args=(self,), daemon=True)
+        self.maintenance_thread.start()
+        self.root.after(appconst.maintenance_poll_interval, self.__maintenanceTick)
+
+        self.root.after(appconst.display_frame_interval, self.__displayTick)
+
+        # metrics of the selected session for the status bar, and of all the sessions for the metrics target
+        self.status_sampler = metrics_utility.metricsSampler()
+        self.root.after(appconst.status_bar_interval, self.__statusTick)
+        self.metrics_publisher = None
+        if not metrics_target == None:
+            self.metrics_publisher = metrics_utility.metricsPublisher(metrics_target, metrics_interval, self.__collectMetrics)
+            self.metrics_publisher.start()
         
 
     def launch(self):
@@ -170,21 +400,104 @@ class App:
         """
         self.__extern_on_close_function = closing_function
 
-    def createFileName(self):
+    def __maintenanceTick(self):
+        """
+        This private method runs periodically on the main thread and applies the latest port and play file lists
+        enumerated by the maintenance thread to the menus; it also shows the buffer usage of the selected session.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        results = None
+        while len(self.maintenance_results):
+            results = self.maintenance_results.popleft()
+
+        if not results == None:
+            self.updatePortsMenu(results[0])
+            self.updatePlayFileMenu(results[1])
+
+        self.buffer_stats_lab['text'] = self.pane.session.bufferReport()
+
+        self.root.after(appconst.maintenance_poll_interval, self.__maintenanceTick)
+
+    def __statusTick(self):
+        """
+        This private method runs periodically on the main thread and shows the metrics of the selected session in the
+        status bar.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        metrics = self.status_sampler.sample(self.pane, self.pane.metrics())
+        self.status_bar['text'] = metrics_utility.metricsReport(metrics)
+
+        self.root.after(appconst.status_bar_interval, self.__statusTick)
+
+    def __collectMetrics(self):
         """
-        This private method creates a unique file name when invoked.
+        This private method returns the metrics of all the sessions for the metrics publisher; it runs on the thread of
+        the publisher.
 
         PARAMETERS
         ----------
         NONE
 
+        RETURNS : list
+        -------
+        A ( pane, metrics ) tuple for every session
+        """
+        return [ (pane, pane.metrics()) for pane in list(self.panes) ]
+
+    def callInMainThread(self, function, *args):
+        """
+        This method queues a function to be invoked on the main thread; it is safe to call from any thread. Queued
+        functions are run in the next display frame.
+
+        PARAMETERS
+        ----------
+        function : function
+        The function to be invoked
+
+        args
+        The arguments to be passed to the function
+
         RETURNS
         -------
         NOTHING
         """
-        now = datetime.now()
-        file_name = now.strftime("temp_%d_%m_%Y_%H_%M_%S")
-        return file_name
+        self.main_thread_calls.append( (function, args) )
+
+    def applySessionSettings(self):
+        """
+        This method copies the port, record and display selections of the user interface to the session of the selected tab.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.pane.session.port = self.getPortSelection()
+        self.pane.session.baud = self.getBaudSelection()
+        self.pane.session.stop_bits = self.getStopBits()
+        self.pane.session.parity = self.getParity()
+        self.pane.session.record = self.doRecord()
+        self.pane.session.record_csv = self.recordAsCSV()
+        self.pane.session.spill_overflow = self.spill_overflow.get()
+        self.pane.session.display_option = self.getDisplayOption()
+        self.pane.session.decode_errors = self.var_decode_errors.get()
 #----------------------------------------------------------------------------------------------------------------------------
 
 
@@ -206,22 +519,72 @@ class App:
         -------
         NOTHING
         """
-        if not self.record_file_name == "":
-            os.remove(self.record_file_name)
+        if not self.metrics_publisher == None:
+            self.metrics_publisher.stop()
 
-        if not self.csv_record_file_name == "":
-            os.remove(self.csv_record_file_name)
+        for pane in self.panes:
+            pane.session.close(remove_records=True)
         
         if not self.__extern_on_close_function == None:
             self.__extern_on_close_function()
         self.root.destroy()
 
-    def serial0StoppedClbk(self, err):
+    def __sessionStarted(self, pane, thread):
+        """
+        This private method is invoked by a serial thread of a session when it has started successfully; the user
+        interface is updated on the main thread.
+
+        PARAMETERS
+        ----------
+        pane : SessionPane
+        The pane of the session
+
+        thread : int
+        0 for the connection, 1 for the playback
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        if thread == 0:
+            self.callInMainThread(self.serial0StartedClbk, pane)
+        else:
+            self.callInMainThread(self.serial1StartedClbk, pane)
+
+    def __sessionStopped(self, pane, thread, err):
         """
-        This method is called by serial thread 0 when it is terminated.
+        This private method is invoked by a serial thread of a session when it is terminated; the user interface is
+        updated on the main thread.
 
         PARAMETERS
         ----------
+        pane : SessionPane
+        The pane of the session
+
+        thread : int
+        0 for the connection, 1 for the playback
+
+        err : str
+        The exception that caused the termination of the serial thread
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        if thread == 0:
+            self.callInMainThread(self.serial0StoppedClbk, pane, err)
+        else:
+            self.callInMainThread(self.serial1StoppedClbk, pane, err)
+
+    def serial0StoppedClbk(self, pane, err):
+        """
+        This method is invoked on the main thread when the connection of a session is terminated.
+
+        PARAMETERS
+        ----------
+        pane : SessionPane
+        The pane of the session
+
         err : str
         The exception that caused the termination of serial thread
 
@@ -230,8 +593,7 @@ class App:
         NOTHING
         """
         print('Error : ', err)
-        self.serial_thread0 = None
-        serial_utility.run_serial_thread0 = 0
+        pane.state = 'idle'
 
         # when there is problem with opening the port
         if err == "SerialException":
@@ -241,62 +603,34 @@ class App:
         elif err == "AttributeError":
             pass
 
-        self.connect_button['state'] = "normal"
-        self.connect_button.configure(text="connect")
+        self.refreshButtons()
 
-    def serial0StartedClbk(self):
+    def serial0StartedClbk(self, pane):
         """
-        This method is called by serial thread 0 when it has started successfully.
+        This method is invoked on the main thread when the connection of a session has started successfully.
 
         PARAMETERS
         ----------
-        NONE
+        pane : SessionPane
+        The pane of the session
 
         RETURNS
         -------
         NOTHING
         """
-        # clear the recorded data upon a new connection
-        self.recorded_data.flush()
-        self.recorded_csv_list=[]
-        self.csv_data_var=b''
-        self.csv_index = 0
-
-        # if there exits a record file when a connection is made then, delete it
-        if not self.record_file_name == "":
-            os.remove(self.record_file_name)
-            self.record_file_name=""
-
-        # if there exits a record file when a connection is made then, delete it
-        if not self.csv_record_file_name == "":
-            os.remove(self.csv_record_file_name)
-            self.csv_record_file_name=""
+        pane.state = 'connected'
+        self.notebook.tab(pane.frame, text=pane.session.port)
+        self.refreshButtons()
 
-        # Create a record file only when a workspace has been selected. This mechanism is fail proof because, recording
-        # can be enabled only when there is valid workspace selected and similarly record file can be created only
-        # when a valid workspace is selected. Moreover, there is data in the record buffer only when record option is enabled.
-        # So, indirectly, there is data in the record buffer only when there is a valid workspace and hence a valid record file.
-        wrksp = os_utility.getActiveWorkspace()
-        if not wrksp == "none":
-            flnm = os.path.join(wrksp, self.createFileName()+'.bin')
-            with open( flnm , 'ab') as fl:
-                fl.write(b'')
-            self.record_file_name = flnm
-
-            flnm = os.path.join(wrksp, self.createFileName()+'.csv')
-            with open( flnm , 'w') as fl:
-                fl.write('')
-            self.csv_record_file_name = flnm
-
-        self.connect_button['state'] = "normal"
-        self.connect_button.configure(text="disconnect")
-
-    def serial1StoppedClbk(self, err):
+    def serial1StoppedClbk(self, pane, err):
         """
-        This method is called by serial thread 1 when it is terminated.
+        This method is invoked on the main thread when the playback of a session is terminated.
 
         PARAMETERS
         ----------
+        pane : SessionPane
+        The pane of the session
+
         err : str
         The exception that caused the termination of the serial thread
 
@@ -305,8 +639,9 @@ class App:
         NOTHING
         """
         print('Error : ', err)
-        self.serial_thread1 = None
-        serial_utility.run_serial_thread1 = 0
+        if not pane.session.play_scheduler == None:
+            pane.play_report = pane.session.play_scheduler.report()
+        pane.state = 'idle'
 
         # when there is problem with opening the port
         if err == "SerialException":
@@ -316,14 +651,90 @@ class App:
         elif err == "AttributeError":
             pass
 
-        self.connect_button['state'] = "normal"
-        self.send_button['state']="normal"
-        self.play_button['state']="normal"
-        self.play_button['text']="play"
+        self.refreshButtons()
 
-    def serial1StartedClbk(self):
+    def serial1StartedClbk(self, pane):
         """
-        This method is called by serial thread 1 when it has started successfully.
+        This method is invoked on the main thread when the playback of a session has started successfully.
+
+        PARAMETERS
+        ----------
+        pane : SessionPane
+        The pane of the session
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        pane.state = 'playing'
+        pane.play_report = None
+        self.notebook.tab(pane.frame, text=pane.session.port)
+        self.refreshButtons()
+
+    def refreshButtons(self):
+        """
+        This method sets the text and state of the connect, play and send buttons according to the state of the session
+        of the selected tab.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        state = self.pane.state
+
+        if state == 'connected':
+            self.connect_button.configure(text="disconnect", state="normal")
+        elif state == 'idle':
+            self.connect_button.configure(text="connect", state="normal")
+        else:
+            self.connect_button.configure(text="connect", state="disabled")
+
+        if state == 'playing':
+            self.play_button.configure(text="stop", state="normal")
+        elif state == 'starting':
+            self.play_button.configure(text="play", state="disabled")
+        else:
+            self.play_button.configure(text="play", state="normal")
+
+        if state == 'playing' or state == 'starting':
+            self.send_button['state'] = "disabled"
+        else:
+            self.send_button['state'] = "normal"
+
+        if self.pane.isBusy() or len(self.panes) == 1:
+            self.close_tab_button['state'] = "disabled"
+        else:
+            self.close_tab_button['state'] = "normal"
+
+    def addPane(self):
+        """
+        This method creates a new session with its own tab in the display notebook, and selects the tab.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        pane = SessionPane(self.notebook, SerialSession())
+        pane.session.on_started = lambda thread: self.__sessionStarted(pane, thread)
+        pane.session.on_stopped = lambda thread, err: self.__sessionStopped(pane, thread, err)
+
+        self.panes.append(pane)
+        self.notebook.add(pane.frame, text="-")
+        self.notebook.select(pane.frame)
+        self.pane = pane
+
+    def __newTabHandler(self):
+        """
+        EVENT HANDLER
+        This method is invoked when the new tab button is clicked.
 
         PARAMETERS
         ----------
@@ -333,40 +744,60 @@ class App:
         -------
         NOTHING
         """
-        # clear the recorded data upon a new connection
-        self.recorded_data.flush()
-        self.recorded_csv_list=[]
-        self.csv_data_var=b''
-        self.csv_index = 0
+        self.addPane()
+
+    def __closeTabHandler(self):
+        """
+        EVENT HANDLER
+        This method is invoked when the close tab button is clicked; the session of the selected tab is closed and its
+        record files are deleted.
 
-        # if there exits a record file when a connection is made then, delete it
-        if not self.record_file_name == "":
-            os.remove(self.record_file_name)
-            self.record_file_name=""
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        if self.pane.isBusy() or len(self.panes) == 1:
+            return
 
-        # if there exits a record file when a connection is made then, delete it
-        if not self.csv_record_file_name == "":
-            os.remove(self.csv_record_file_name)
-            self.csv_record_file_name=""
+        pane = self.pane
+        self.panes.remove(pane)
+        self.status_sampler.forget(pane)
+        if not self.metrics_publisher == None:
+            self.metrics_publisher.forget(pane)
+        pane.session.close(remove_records=True)
+        self.notebook.forget(pane.frame)
+        pane.frame.destroy()
 
-        # Create a record file only when a workspace has been selected. This mechanism is fail proof because, recording
-        # can be enabled only when there is valid workspace selected and similarly record file can be created only
-        # when a valid workspace is selected. Moreover, there is data in the record buffer only when record option is enabled.
-        # So, indirectly, there is data in the record buffer only when there is a valid workspace and hence a valid record file.
-        wrksp = os_utility.getActiveWorkspace()
-        if not wrksp == "none":
-            flnm = os.path.join(wrksp, self.createFileName() + '.bin')
-            with open( flnm , 'ab') as fl:
-                fl.write(b'')
-            self.record_file_name = flnm
+    def __tabChangedHandler(self, event):
+        """
+        EVENT HANDLER
+        This method is invoked when another tab of the display notebook is selected; the controls are updated to show the
+        session of the tab.
 
-            flnm = os.path.join(wrksp, self.createFileName()+'.csv')
-            with open( flnm , 'w') as fl:
-                fl.write('')
-            self.csv_record_file_name = flnm
+        PARAMETERS
+        ----------
+        event : tkinter event object
 
-        self.play_button['state']='normal'
-        self.play_button['text']='stop'
+        RETURNS
+        -------
+        NOTHING
+        """
+        frame = self.notebook.select()
+        for pane in self.panes:
+            if str(pane.frame) == frame:
+                self.pane = pane
+
+        session = self.pane.session
+        self.var_disp.set(session.display_option)
+        self.var_decode_errors.set(session.decode_errors)
+        self.do_record.set(session.record)
+        self.record_csv.set(session.record_csv)
+        self.spill_overflow.set(session.spill_overflow)
+        self.refreshButtons()
 #---------------------------------------------------------------------------------------------------------------------------
 
 
@@ -472,9 +903,10 @@ class App:
         -------
         NOTHING
         """
-        if self.connect_button['text'] == 'disconnect':
-            self.information("Disconnect port before changing workspace")
-            return
+        for pane in self.panes:
+            if pane.isBusy():
+                self.information("Disconnect all ports before changing workspace")
+                return
 
         dir_name = filedialog.askdirectory()
         if not dir_name == '':
@@ -567,6 +999,9 @@ class App:
         self.lab4 = tk.Label(self.ports_segment_frm0, text="-", width=appconst.connection_button_width)
         self.lab4.pack(expand=1, side=tk.LEFT)
 
+        self.lab5 = tk.Label(self.ports_segment_frm0, text="-", width=appconst.tab_button_width * 2)
+        self.lab5.pack(expand=1, side=tk.LEFT)
+
     def __createPortsMenu(self):
         """
         This private method creates the ports segment menu.
@@ -659,13 +1094,36 @@ class App:
         # DISABLING THE BUTTON
         self.connect_button['state']="disabled"
 
-        if self.connect_button['text'] == 'connect':
-            serial_utility.run_serial_thread0 = 1
-            self.serial_thread0 = threading.Thread(target = serial_utility.SERIAL_THREAD0, args=(self,), daemon=True)
-            self.serial_thread0.start()
+        if self.pane.state == 'idle':
+            if self.__portInUse(self.getPortSelection()):
+                self.information("Port is in use in another tab")
+                self.refreshButtons()
+                return
+
+            self.pane.state = 'connecting'
+            self.refreshButtons()
+            self.applySessionSettings()
+            self.pane.session.connect()
         else:
-            serial_utility.run_serial_thread0 = 0
+            self.pane.session.disconnect()
+
+    def __portInUse(self, port):
+        """
+        This private method returns whether a port is used by the session of another tab.
+
+        PARAMETERS
+        ----------
+        port : str
+        The name of the port
 
+        RETURNS : bool
+        -------
+        True if another tab is connected to, or playing on, the port
+        """
+        for pane in self.panes:
+            if not pane == self.pane and pane.isBusy() and pane.session.port == port:
+                return True
+        return False
     def __createConnectionButton(self):
         """
         This private method creates the connect/disconnect button.
@@ -681,13 +1139,20 @@ class App:
         self.connect_button = tk.Button(self.ports_segment_frm1, text="connect", command=self.__connectionHandler, width=appconst.connection_button_width)
         self.connect_button.pack(expand=1, side=tk.LEFT, padx=5, pady=5)
 
-    def updatePortsMenu(self):
+        self.new_tab_button = tk.Button(self.ports_segment_frm1, text="new tab", command=self.__newTabHandler, width=appconst.tab_button_width)
+        self.new_tab_button.pack(expand=1, side=tk.LEFT, padx=5, pady=5)
+
+        self.close_tab_button = tk.Button(self.ports_segment_frm1, text="close tab", command=self.__closeTabHandler, width=appconst.tab_button_width)
+        self.close_tab_button.pack(expand=1, side=tk.LEFT, padx=5, pady=5)
+
+    def updatePortsMenu(self, ports_list=None):
         """
         This method is used to update the ports menu in the SETTINGS MENU of the application.
 
         PARAMETERS
         ----------
-        NONE
+        ports_list : list
+        The list of available ports; the ports are enumerated if it is not provided
 
         RETURNS
         -------
@@ -697,7 +1162,9 @@ class App:
         current_port_selection = self.getPortSelection()
 
         self.port_menu.children["menu"].delete(0, "end")
-        self.ports_list=serial_utility.getPorts()
+        if ports_list == None:
+            ports_list = serial_utility.getPorts()
+        self.ports_list=ports_list
         
         for i in self.ports_list:
             self.port_menu.children["menu"].add_command(label=i, command=lambda value=i: self.var_ports.set(value))
@@ -801,6 +1268,7 @@ class App:
         self.__createSaveButton()
         self.__createPlayFileMenu()
         self.__createDelayBox()
+        self.__createTimingMenu()
         self.__createPlayButton()
 
     def __createDisplayOptCheckBoxes(self):
@@ -817,12 +1285,52 @@ class App:
         """
 
         self.var_disp = tk.IntVar()
-        self.disp_cbox0 = tk.Radiobutton(self.display_section, text="ASCII", variable=self.var_disp, value=1, justify="left")
-        self.disp_cbox1 = tk.Radiobutton(self.display_section, text="HEX ", variable=self.var_disp, value=2, justify="left")
+        self.disp_cbox0 = tk.Radiobutton(self.display_section, text="ASCII", variable=self.var_disp, value=1, justify="left", command=self.__displayOptionHandler)
+        self.disp_cbox1 = tk.Radiobutton(self.display_section, text="HEX ", variable=self.var_disp, value=2, justify="left", command=self.__displayOptionHandler)
+        self.disp_cbox2 = tk.Radiobutton(self.display_section, text="HEX DUMP", variable=self.var_disp, value=3, justify="left", command=self.__displayOptionHandler)
         self.disp_cbox0.pack(expand=1, padx=5, pady=5)
         self.disp_cbox1.pack(expand=1, padx=5, pady=5)
+        self.disp_cbox2.pack(expand=1, padx=5, pady=5)
         self.disp_cbox0.select()
 
+        # handling of received bytes that are not valid UTF-8
+        self.decode_errors_lab = tk.Label(self.display_section, text="Invalid UTF-8 :")
+        self.decode_errors_lab.pack(expand=1, padx=5, pady=5)
+        self.var_decode_errors = tk.StringVar(self.display_section)
+        self.var_decode_errors.set(appconst.default_decode_errors)
+        self.decode_errors_menu = tk.OptionMenu(self.display_section, self.var_decode_errors, *utils.decode_error_list, command=self.__decodeErrorsHandler)
+        self.decode_errors_menu.config(width=appconst.decode_errors_menu_width, padx=2)
+        self.decode_errors_menu.pack(expand=1, padx=5, pady=5)
+
+    def __displayOptionHandler(self):
+        """
+        This private method is invoked whenever a display option is selected.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.pane.session.display_option = self.getDisplayOption()
+
+    def __decodeErrorsHandler(self, value):
+        """
+        This private method is invoked whenever a decode error option is selected.
+
+        PARAMETERS
+        ----------
+        value : str
+        The selected option
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.pane.session.decode_errors = value
+
     def __toggleRecordOption(self):
         """
         This method is invoked whenever the record option is toggled.
@@ -845,6 +1353,9 @@ class App:
             #if the record option has been deselected then deselect the record as csv option as well
             self.record_csv_option.deselect()
 
+        self.pane.session.record = self.doRecord()
+        self.pane.session.record_csv = self.recordAsCSV()
+
     def __createRecordOption(self):
         """
         This private method creates a checkbox that is used to enable recording the incoming data.
@@ -876,9 +1387,12 @@ class App:
         if not self.doRecord():
             self.record_csv_option.deselect()
 
+        self.pane.session.record_csv = self.recordAsCSV()
+
     def __createRecordAsCSVOption(self):
         """
-        This private method creates a checkbox that will be used to enable recording the incoming data in csv format.
+        This private method creates the checkboxes that are used to enable recording the incoming data in csv format and
+        keeping the data that overflows the receive buffer in a temporary file.
 
         PARAMETER
         ---------
@@ -892,6 +1406,26 @@ class App:
         self.record_csv_option = tk.Checkbutton(self.record_section, text="Record as CSV", variable=self.record_csv, command=self.__toggleRecordAsCSV)
         self.record_csv_option.pack(expand=1, padx=5, pady=5)
 
+        # keeps a recording lossless when the record thread briefly falls behind
+        self.spill_overflow = tk.IntVar()
+        self.spill_overflow.set(appconst.spill_overflow)
+        self.spill_overflow_option = tk.Checkbutton(self.record_section, text="Spill overflow to disk", variable=self.spill_overflow, command=self.__toggleSpillOverflow)
+        self.spill_overflow_option.pack(expand=1, padx=5, pady=5)
+
+    def __toggleSpillOverflow(self):
+        """
+        This private method is invoked when the spill overflow checkbox is toggled.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.pane.session.spill_overflow = self.spill_overflow.get()
+
     def __saveButtonHandler(self):
         """
         EVENT HANDLER
@@ -905,38 +1439,85 @@ class App:
         -------
         NOTHING
         """
-        # If there is unprocessed data then, ask the user to wait
-        if self.receive_buff.filled or self.recorded_data.filled or len(self.recorded_csv_list):
-            self.information("Processing, kindly wait ")
-            return
+        # The record files are copied up to their current size, so data may keep arriving while they are saved
+        self.pane.session.flushRecordFiles()
 
-        if self.record_file_name == "" or self.csv_record_file_name == "":
+        segments = self.pane.session.recordSegments()
+        if len(segments) == 0:
             self.information("No recorded data !")
             return
 
-        with open(self.record_file_name, 'rb') as fl:
-            data_byts = fl.read()
-
-        with open(self.csv_record_file_name) as fl:
-            csv_data = fl.read()
-
-        if len(data_byts) == 0 and len(csv_data) == 0:
+        recorded = 0
+        for segment in segments:
+            for ext in ('.bin', '.csv'):
+                if os.path.exists(segment + ext):
+                    recorded = recorded + os.path.getsize(segment + ext)
+        if recorded == 0:
             self.information("No recorded data")
             return
 
         file_name = filedialog.asksaveasfilename()
+        if not file_name:
+            return
 
-        if len(data_byts):
-            with open( file_name + '.bin' , 'wb' ) as fl:
-                fl.write(data_byts)
-        
-        if len(csv_data):
-            with open( file_name + '.csv', 'w') as fl:
-                fl.write(csv_data)
+        # the segments are saved under the chosen name, numbered like the record files after the first one; the
+        # recording container lets the saved recording be replayed with its original timing
+        jobs = []
+        for number, segment in enumerate(segments):
+            target = file_name
+            if number:
+                target = file_name + '.' + str(number + 1)
+
+            for ext in ('.bin', '.csv', record_utility.recording_extension, record_utility.index_extension):
+                if not os.path.exists(segment + ext):
+                    continue
+                size = os.path.getsize(segment + ext)
+                if size == 0 and ext in ('.bin', '.csv'):
+                    continue
+                jobs.append( (segment + ext, target + ext, size) )
+
+        # the files are copied in the background
+        self.save_button['state'] = "disabled"
+        self.save_progress['value'] = 0
+        self.save_thread = threading.Thread(target = SAVE_THREAD, args=(self, jobs), daemon=True)
+        self.save_thread.start()
+
+    def saveProgressClbk(self, percent):
+        """
+        This method is invoked on the main thread while record files are being saved.
+
+        PARAMETERS
+        ----------
+        percent : int
+        The percentage of the bytes copied so far
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.save_progress['value'] = percent
+
+    def saveFinishedClbk(self, err):
+        """
+        This method is invoked on the main thread when the record files have been saved.
+
+        PARAMETERS
+        ----------
+        err : str
+        Description of the error that stopped the save, or None if the files were saved
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.save_button['state'] = "normal"
+        self.save_progress['value'] = 0
+        if not err == None:
+            self.error("Could not save : " + err)
     
     def __createSaveButton(self):
         """
-        This private method creates the 'save' button.
+        This private method creates the 'save' button and the progress bar of a save.
 
         PARAMETERS
         ----------
@@ -949,6 +1530,10 @@ class App:
         self.save_button = tk.Button(self.record_section, text="save", command=self.__saveButtonHandler, width=appconst.save_button_width)
         self.save_button.pack(expand=1, padx=5, pady=5)
 
+        # progress of a save running in the background
+        self.save_progress = ttk.Progressbar(self.record_section, mode='determinate', maximum=100, length=appconst.save_progress_length)
+        self.save_progress.pack(expand=1, padx=5, pady=5)
+
     def doRecord(self):
         """
         This method returns the status of enable recording checkbox.
@@ -988,8 +1573,9 @@ class App:
 
         RETURNS : int
         -------
-        0 : ASCII
-        1 : HEX
+        1 : ASCII
+        2 : HEX
+        3 : HEX DUMP
         """
         return self.var_disp.get()
 
@@ -1018,20 +1604,22 @@ class App:
         self.play_file_menu.config(width=appconst.play_file_menu_width, padx=2)
         self.play_file_menu.pack(expand=1, padx=5, pady=5)
     
-    def updatePlayFileMenu(self):
+    def updatePlayFileMenu(self, files_list=None):
         """
         This method updates the drop down menu that is used for selecting to be played file.
         
         PARAMETERS
         ----------
-        NONE
+        files_list : list
+        The list of play files in the workspace; the workspace is listed if it is not provided
 
         RETURNS
         -------
         NOTHING
         """
         self.play_file_menu.children["menu"].delete(0, "end")
-        files_list = os_utility.filesInWorkspace()
+        if files_list == None:
+            files_list = os_utility.filesInWorkspace()
         for i in files_list:
             self.play_file_menu.children["menu"].add_command(label=i, command=lambda value=i: self.var_play_file.set(value))
         if len(files_list)==0:
@@ -1098,10 +1686,9 @@ class App:
             except:
                 return -1.0
     
-    def playButtonHandler(self):
+    def __createTimingMenu(self):
         """
-        EVENT HANDLER
-        This method is invoked whenever the play button is clicked on.
+        This private method creates the drop down menu for selecting how the timing of a played file is reproduced.
 
         PARAMETERS
         ----------
@@ -1111,54 +1698,86 @@ class App:
         -------
         NOTHING
         """
-        def disableButtons(app):
-            app.connect_button['state']="disabled"
-            app.play_button['state']="disabled"
-            app.send_button['state']="disabled"
+        self.var_timing = tk.StringVar(self.play_section)
+        self.var_timing.set(appconst.replay_timing_list[0])
+        self.timing_menu = tk.OptionMenu(self.play_section, self.var_timing, *appconst.replay_timing_list)
+        self.timing_menu.config(width=appconst.play_file_menu_width, padx=2)
+        self.timing_menu.pack(expand=1, padx=5, pady=5)
 
-        def enableButtons(app):
-            app.connect_button['state']="normal"
-            app.play_button['state']="normal"
-            app.send_button['state']="normal"
+    def getSpeed(self):
+        """
+        This method returns the replay speed selected in the timing menu.
 
-        disableButtons(self)
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : float
+        -------
+        The speed factor of a timed replay, 0 to send the file as fast as possible
+        OR
+        None - If the file is to be sent at the delay given in the delay box
+        """
+        val = self.var_timing.get()
+        if val == 'delay':
+            return None
+        elif val == 'max':
+            return 0.0
+        else:
+            return float(val.rstrip('x'))
 
-        if self.play_button['text'] == 'play':
+    def playButtonHandler(self):
+        """
+        EVENT HANDLER
+        This method is invoked whenever the play button is clicked on.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        if self.pane.state == 'idle':
 
             # if a port is already connected then, cancel any further operations
-            if self.connect_button['text'] == 'disconnect':
-                self.information("Disconnect before playing !!")
-                enableButtons(self)
+            if self.__portInUse(self.getPortSelection()):
+                self.information("Port is in use in another tab")
                 return
 
             # if no valid play file is selected then, cancel any futher operations
             if self.getPlayFile() == '-':
                 self.error("No play file selected")
-                enableButtons(self)
                 return
         
-            delay = self.getDelay()
-            if delay < 0:
-                self.information("Invalid delay")
-                enableButtons(self)
-                return
+            speed = self.getSpeed()
+            delay = 0.0
+            if speed == None:
+                delay = self.getDelay()
+                if delay < 0:
+                    self.information("Invalid delay")
+                    return
             
+            self.applySessionSettings()
             try:
-                with open( os.path.join(os_utility.getActiveWorkspace(), self.getPlayFile()), 'rb') as fl:
-                    byts = fl.read()
-                
-                self.send_buff.enqueue( byts )
-
+                self.pane.session.play( os.path.join(os_utility.getActiveWorkspace(), self.getPlayFile()), delay, speed )
+            except ValueError:
+                self.error("No timing recorded for this file")
+                return
             except:
                 self.error("Could not read file")
-                enableButtons(self)
                 return
 
-            serial_utility.run_serial_thread1 = 1
-            self.serial_thread1 = threading.Thread(target = serial_utility.SERIAL_THREAD1, args=(self,delay), daemon=True)
-            self.serial_thread1.start()
-        else:
-            serial_utility.run_serial_thread1 = 0
+            self.pane.state = 'starting'
+            self.refreshButtons()
+
+        elif self.pane.state == 'connected':
+            self.information("Disconnect before playing !!")
+
+        elif self.pane.state == 'playing':
+            self.play_button['state']="disabled"
+            self.pane.session.stopPlay()
 
 
     def __createPlayButton(self):
@@ -1183,6 +1802,32 @@ class App:
 
 
 
+#---------------------------------------------------------------------------------------------------------------------------
+# STATUS BAR
+
+    def __createStatusBar(self):
+        """
+        This private method creates the status bar at the bottom of the window.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.status_bar = tk.Label(self.root, text="-", anchor=tk.W, relief=tk.SUNKEN)
+        self.status_bar.pack(side=tk.BOTTOM, fill=tk.X, padx=5, pady=2)
+
+#---------------------------------------------------------------------------------------------------------------------------
+# END OF STATUS BAR
+#---------------------------------------------------------------------------------------------------------------------------
+
+
+
+
+
 #---------------------------------------------------------------------------------------------------------------------------
 # RIGHT SEGMENT
 
@@ -1258,7 +1903,7 @@ class App:
             if self.sendNewline():
                 byt_str = byt_str + b'\n'
 
-            if self.send_buff.enqueue(byt_str) == False:
+            if self.pane.session.send(byt_str) == False:
                 self.error("Insufficient space in send buffer")
 
             if not self.isPacketMode():
@@ -1290,7 +1935,7 @@ class App:
 
     def __createDisplayBox(self):
         """
-        This method creates a text box where incoming data is displayed.
+        This method creates the notebook whose tabs display the incoming data of the sessions.
 
         PARAMETERS
         ----------
@@ -1300,12 +1945,22 @@ class App:
         -------
         NOTHING
         """
-        self.display = tk.Text(self.right_segment, bg=appconst.display_color, fg=appconst.display_text_color, xscrollcommand=False, yscrollcommand=True, width=appconst.entry_width + 20)
-        self.display.configure(font=(appconst.display_font, appconst.display_font_size))
-        self.display.pack(expand=1, fill=tk.X, padx=5, pady=5)
+        self.notebook = ttk.Notebook(self.right_segment)
+        self.notebook.pack(expand=1, fill=tk.X, padx=5, pady=5)
+        self.notebook.bind('<<NotebookTabChanged>>', self.__tabChangedHandler)
+
+        self.display_buttons_frm = tk.Frame(self.right_segment)
+        self.display_buttons_frm.pack(expand=1)
+
+        self.clear_display_button=tk.Button(self.display_buttons_frm, text="Clear",command=self.clearDisplayHandler, width=appconst.clear_button_width)
+        self.clear_display_button.pack(expand=1, side=tk.LEFT, padx=5)
+
+        self.history_button=tk.Button(self.display_buttons_frm, text="History", command=self.historyButtonHandler, width=appconst.history_button_width)
+        self.history_button.pack(expand=1, side=tk.LEFT, padx=5)
 
-        self.clear_display_button=tk.Button(self.right_segment, text="Clear",command=self.clearDisplayHandler, width=appconst.clear_button_width)
-        self.clear_display_button.pack(expand=1)      
+        # usage of the buffers of the session of the selected tab
+        self.buffer_stats_lab = tk.Label(self.display_buttons_frm, text="-")
+        self.buffer_stats_lab.pack(expand=1, side=tk.LEFT, padx=5)
 
     def getTextEntry0(self):
         """
@@ -1393,8 +2048,35 @@ class App:
         """
         return self.send_newline.get()
 
-    def scroll(self):
-        self.display.see(tk.END)
+    def __displayTick(self):
+        """
+        This private method runs on the main thread once every display frame. It runs the functions queued by other
+        threads, then the text queued for every tab since the last frame is drawn with a single insert followed by a
+        single scroll per tab.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        # an error in one function or tab must neither stop the others nor the display frames
+        while len(self.main_thread_calls):
+            function, args = self.main_thread_calls.popleft()
+            try:
+                function(*args)
+            except Exception as e:
+                print('Error : ', e)
+
+        for pane in self.panes:
+            try:
+                pane.drawPending()
+            except Exception as e:
+                print('Error : ', e)
+
+        self.root.after(appconst.display_frame_interval, self.__displayTick)
 
     def clearDisplayHandler(self):
         """
@@ -1413,7 +2095,7 @@ class App:
 
     def clearDisplay(self):
         """
-        This method clears the display box.
+        This method clears the display box of the selected tab.
 
         PARAMETERS
         ----------
@@ -1423,22 +2105,57 @@ class App:
         -------
         NOTHING
         """
-        self.display.delete( '1.0', 'end')
+        self.pane.clearDisplay()
 
-    def putOnDisplay(self, text):
+    def historyButtonHandler(self):
         """
-        This function appends text to display box.
+        EVENT HANDLER
+        This method is invoked when the history button is clicked. It opens a window that pages through the text that has
+        been trimmed from the display box.
 
         PARAMETERS
         ----------
-        text : str
-        The text to be displayed in the display area
+        NONE
 
         RETURNS
         -------
         NOTHING
         """
-        self.display.insert(tk.END, text)
+        scrollback = self.pane.scrollback
+        if scrollback.lines == 0:
+            self.information("No history")
+            return
+
+        window = tk.Toplevel(self.root)
+        window.title(appconst.application_title + " - history")
+
+        text_box = tk.Text(window, bg=appconst.display_color, fg=appconst.display_text_color, width=appconst.entry_width + 20)
+        text_box.configure(font=(appconst.display_font, appconst.display_font_size))
+        text_box.pack(expand=1, fill=tk.BOTH, padx=5, pady=5)
+
+        buttons_frm = tk.Frame(window)
+        buttons_frm.pack(expand=1)
+        page_label = tk.Label(buttons_frm, text="")
+
+        # start on the newest page; 'start' is the index of the first line shown
+        page = { 'start' : max(scrollback.lines - appconst.history_page_lines, 0) }
+
+        def showPage(start):
+            start = min(max(start, 0), max(scrollback.lines - appconst.history_page_lines, 0))
+            page['start'] = start
+            text_box.configure(state='normal')
+            text_box.delete('1.0', 'end')
+            text_box.insert(tk.END, scrollback.getLines(start, appconst.history_page_lines))
+            text_box.configure(state='disabled')
+            page_label.configure(text="lines %d - %d of %d" % (start + 1, min(start + appconst.history_page_lines, scrollback.lines), scrollback.lines))
+
+        older_button = tk.Button(buttons_frm, text="older", width=appconst.send_button_width, command=lambda: showPage(page['start'] - appconst.history_page_lines))
+        newer_button = tk.Button(buttons_frm, text="newer", width=appconst.send_button_width, command=lambda: showPage(page['start'] + appconst.history_page_lines))
+        older_button.pack(side=tk.LEFT, padx=5, pady=5)
+        page_label.pack(side=tk.LEFT, padx=5, pady=5)
+        newer_button.pack(side=tk.LEFT, padx=5, pady=5)
+
+        showPage(page['start'])
 
 # END OF RIGHT SEGMENT
 #---------------------------------------------------------------------------------------------------------------------------
\ No newline at end of file
@@ -0,0 +1,185 @@
+"""
+This module runs serial sessions from the command line, without the user interface. Received data is printed to the
+standard output; status messages are printed to the standard error.
+"""
+
+__author__ = "ASHUTOSH SINGH PARMAR"
+
+import os
+import sys
+import threading
+import time
+
+from session import SerialSession
+from utility import metrics_utility
+
+# display options of the session corresponding to the --display argument
+display_options = { 'ascii' : 1, 'hex' : 2, 'hexdump' : 3, 'none' : 0 }
+
+# serialises the output of the sessions
+output_lock = threading.Lock()
+
+def createSession(args, port, prefix):
+    """
+    This function creates a session for one port, configured as described by the parsed command line arguments.
+
+    PARAMETERS
+    ----------
+    args : argparse.Namespace
+    The parsed command line arguments
+
+    port : str
+    The port of the session
+
+    prefix : str
+    Text printed in front of every chunk of data received by the session
+
+    RETURNS : SerialSession
+    -------
+    The session
+    """
+    session = SerialSession()
+    session.port = port
+    session.baud = args.baud
+    session.stop_bits = args.stop_bits
+    session.parity = args.parity
+    session.display_option = display_options[args.display]
+    session.decode_errors = args.decode_errors
+
+    # record files are only created when a directory to record into is provided
+    session.workspace = "none"
+    if not args.record == None:
+        session.workspace = args.record
+        session.record = 1
+        session.record_csv = 1 if args.csv else 0
+        session.spill_overflow = 1 if args.spill else 0
+        session.record_name = args.name
+        if not args.segment_size == None:
+            session.record_segment_size = int(args.segment_size * 1024 * 1024)
+        if not args.segment_time == None:
+            session.record_segment_time = args.segment_time
+        if not args.keep == None:
+            session.record_segment_keep = args.keep
+        if not args.name == None and len(args.port) > 1:
+            session.record_name = args.name + '_' + os.path.basename(port)
+
+    if not args.display == 'none':
+        def display(text):
+            with output_lock:
+                sys.stdout.write(prefix + text)
+                sys.stdout.flush()
+        session.on_display = display
+
+    return session
+
+def run(args):
+    """
+    This function connects to the ports, or plays a file to them, as described by the parsed command line arguments and
+    returns when all the sessions have ended.
+
+    PARAMETERS
+    ----------
+    args : argparse.Namespace
+    The parsed command line arguments
+
+    RETURNS : int
+    -------
+    The exit status : 0 on success, 1 if a port could not be used or the play file could not be read
+    """
+    if args.port == None:
+        print("Error : --port is required in headless mode", file=sys.stderr)
+        return 1
+
+    sessions = []
+    stopped = threading.Semaphore(0)
+    errors = []
+
+    for port in args.port:
+        prefix = "" if len(args.port) == 1 else "[" + port + "] "
+        session = createSession(args, port, prefix)
+
+        def started(thread, port=port):
+            print("Connected to " + port, file=sys.stderr)
+
+        def stopped_clbk(thread, err, port=port, session=session):
+            if err == "SerialException":
+                errors.append(port)
+            elif thread == 1 and not session.play_scheduler == None:
+                print(port + " : " + session.play_scheduler.report(), file=sys.stderr)
+            stopped.release()
+
+        session.on_started = started
+        session.on_stopped = stopped_clbk
+        sessions.append(session)
+
+    # the runtime metrics of the sessions are published from a thread of their own
+    publisher = None
+    if not args.metrics == None:
+        publisher = metrics_utility.metricsPublisher(args.metrics, args.metrics_interval,
+                                                     lambda: [ (session, session.metrics()) for session in sessions ])
+        publisher.start()
+
+    def stopAll():
+        for session in sessions:
+            session.disconnect()
+            session.stopPlay()
+
+    running = 0
+    ended = 0
+    try:
+        for session in sessions:
+            if args.play == None:
+                session.connect()
+            else:
+                try:
+                    session.play(args.play, args.delay, args.speed, args.start)
+                except OSError as e:
+                    print("Error : could not read file - " + str(e), file=sys.stderr)
+                    stopAll()
+                    break
+                except ValueError as e:
+                    print("Error : " + str(e), file=sys.stderr)
+                    stopAll()
+                    break
+            running = running + 1
+
+        # wait for every session to end, or for the duration to expire
+        deadline = None
+        if not args.duration == None:
+            deadline = time.monotonic() + args.duration
+        while ended < running:
+            timeout = None
+            if not deadline == None:
+                timeout = max(deadline - time.monotonic(), 0)
+            if not stopped.acquire(timeout=timeout):
+                stopAll()
+                deadline = None
+                continue
+            ended = ended + 1
+
+    except KeyboardInterrupt:
+        stopAll()
+        while ended < running:
+            stopped.acquire()
+            ended = ended + 1
+
+    if not publisher == None:
+        publisher.stop()
+
+    status = 0
+    for session in sessions:
+        session.close(remove_records=False)
+        for segment in session.recordSegments():
+            print("Recorded to " + segment + ".bin", file=sys.stderr)
+        print(session.port + " : " + session.bufferReport(), file=sys.stderr)
+        if not session.record_error == None:
+            print("Error : %s : writing the record files failed %d times, last : %s" % (session.port, session.record_errors,
+                  session.record_error), file=sys.stderr)
+            status = 1
+
+    for port in errors:
+        print("Error : port unavailable - " + port, file=sys.stderr)
+        status = 1
+    if running < len(sessions):
+        status = 1
+    return status
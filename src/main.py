@@ -1,11 +1,104 @@
 """
 Main script for the serial terminal application
 """
-import application as app
+import argparse
+import sys
 
-#creating the application
-APP = app.App()
+import app_constants as appconst
+
+def replaySpeed(text):
+    """
+    This function converts the value of the --speed argument, checking that it is in the supported range
+
+    PARAMETERS
+    ----------
+    text : str
+    The value of the argument
+
+    RETURNS : float
+    -------
+    The speed factor; 0 for 'max'
+    """
+    if text == 'max':
+        return 0.0
+    try:
+        speed = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid speed : " + text)
+    if speed < appconst.min_replay_speed or speed > appconst.max_replay_speed:
+        raise argparse.ArgumentTypeError("speed must be between %g and %g, or max" % (appconst.min_replay_speed, appconst.max_replay_speed))
+    return speed
+
+def metricsInterval(text):
+    """
+    This function converts the value of the --metrics-interval argument, checking that it is positive
+
+    PARAMETERS
+    ----------
+    text : str
+    The value of the argument
+
+    RETURNS : float
+    -------
+    The interval in seconds
+    """
+    try:
+        interval = float(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid interval : " + text)
+    if not interval > 0:
+        raise argparse.ArgumentTypeError("interval must be greater than 0")
+    return interval
+
+def parseArguments(argv):
+    """
+    This function parses the command line arguments of the application
+
+    PARAMETERS
+    ----------
+    argv : list
+    The command line arguments, without the program name
+
+    RETURNS : argparse.Namespace
+    -------
+    The parsed arguments
+    """
+    parser = argparse.ArgumentParser(description="TerMAN - serial terminal for embedded systems development")
+    parser.add_argument('--headless', action='store_true', help="run without the user interface")
+    parser.add_argument('--port', action='append', help="serial port to connect to; repeat to use several ports at once")
+    parser.add_argument('--baud', default='9600', help="baud rate (default 9600)")
+    parser.add_argument('--stop-bits', default='1', choices=['1', '2'], help="number of stop bits (default 1)")
+    parser.add_argument('--parity', default='None', choices=['None', 'Odd', 'Even'], help="parity (default None)")
+    parser.add_argument('--display', default='ascii', choices=['ascii', 'hex', 'hexdump', 'none'], help="form in which received data is printed (default ascii)")
+    parser.add_argument('--decode-errors', default='replace', choices=['replace', 'escape', 'latin-1'], help="how bytes that are not valid UTF-8 are shown in ascii display and csv records (default replace)")
+    parser.add_argument('--record', metavar='DIR', help="record received data as a .bin file in DIR")
+    parser.add_argument('--csv', action='store_true', help="also record received data as a .csv file")
+    parser.add_argument('--name', help="base name of the record files (default: a temporary name)")
+    parser.add_argument('--spill', action='store_true', help="keep received data that overflows the receive buffer in a temporary file instead of dropping it")
+    parser.add_argument('--segment-size', type=float, metavar='MB', help="start a new set of record files every MB megabytes (default 512, 0 for no limit)")
+    parser.add_argument('--segment-time', type=float, metavar='SECONDS', help="start a new set of record files every SECONDS seconds (default no limit)")
+    parser.add_argument('--keep', type=int, metavar='N', help="keep only the N most recent sets of record files (default all)")
+    parser.add_argument('--play', metavar='FILE', help="send the bytes of FILE to the port and exit")
+    parser.add_argument('--delay', type=float, default=0.0, help="delay between bytes sent by --play, in milliseconds")
+    parser.add_argument('--speed', type=replaySpeed, help="replay FILE with its recorded timing, sped up by this factor (0.1 to 100), or 'max' to send it as fast as possible")
+    parser.add_argument('--start', type=float, default=0.0, help="with --speed, start the replay this many seconds into the recording")
+    parser.add_argument('--duration', type=float, help="disconnect after this many seconds")
+    parser.add_argument('--metrics', metavar='TARGET', help="periodically write the runtime metrics as JSON to TARGET : a file, udp:HOST:PORT or unix:PATH")
+    parser.add_argument('--metrics-interval', type=metricsInterval, default=appconst.metrics_interval, metavar='SECONDS', help="interval between two metrics updates (default %g)" % appconst.metrics_interval)
+    return parser.parse_args(argv)
 
 if __name__ == "__main__":
+    args = parseArguments(sys.argv[1:])
+
+    if args.headless:
+        # the headless mode does not import tkinter at all
+        import headless
+        sys.exit( headless.run(args) )
+
+    import application as app
+
+    #creating the application
+    APP = app.App(args.metrics, args.metrics_interval)
+
     #launching the user interface
-    APP.launch()
\ No newline at end of file
+    APP.launch()
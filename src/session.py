@@ -0,0 +1,1156 @@
+"""
+This module contains the SerialSession class which holds the serial communication, recording and playback logic of the
+application. It does not depend on the user interface, so it can be driven by the App class as well as from the command
+line on machines without a display.
+"""
+
+__author__ = "ASHUTOSH SINGH PARMAR"
+
+import collections
+import heapq
+import os
+import time
+from datetime import datetime
+import threading
+
+from utility import serial_utility, os_utility, record_utility, utils
+import app_constants as appconst
+
+
+def RECORD_THREAD(session):
+    """
+    This function is a part of application logic and runs as a separate thread.
+    It takes the data received by the serial threads out of the receive buffer and writes it to the record files.
+
+    PARAMETERS
+    ----------
+    session : SerialSession object
+
+    RETURNS
+    -------
+    NOTHING
+    """
+    # All the thread4 logic goes in here
+    while session.run_record_thread:
+        # an error of the record files (e.g. a full disk) is reported and the recording is retried, so that the thread
+        # keeps draining the receive buffer
+        try:
+            # the record files can not be closed while the dequeued bytes are being written to them
+            with session.record_lock:
+                session.recordPending()
+
+            # Flush the record files if their buffered data has become too old
+            for writer in (session.record_writer, session.csv_record_writer, session.recording_writer):
+                if not writer == None:
+                    writer.poll()
+
+            # Block until more data is received or the buffered record data has to be flushed
+            if not session.spill.pending:
+                session.receive_buff.waitForData(appconst.record_flush_age)
+
+        except Exception as e:
+            session.recordFailed(e)
+            time.sleep(appconst.record_flush_age)
+
+
+class SerialSession:
+    """
+    This class holds the state of a serial session : the port settings, the send and receive buffers, the record files and
+    the serial threads. The user of the class configures the session through its attributes and is informed about
+    received data and state changes through callback functions.
+
+    Attributes
+    ----------
+    port, baud, stop_bits, parity : str
+    Settings of the serial port
+
+    record : int
+    1 if received data is recorded, 0 otherwise
+
+    record_csv : int
+    1 if received data is recorded in csv form as well, 0 otherwise
+
+    display_option : int
+    Form in which received data is passed to on_display; 1 : ASCII, 2 : HEX, 3 : HEX DUMP
+
+    spill_overflow : int
+    1 if received bytes that do not fit into the full receive buffer are kept in a temporary file until they are
+    recorded, 0 if they are dropped
+
+    decode_errors : str
+    Handling of bytes that are not valid UTF-8 in ASCII display and csv records : 'replace', 'escape' (as \\xNN) or
+    'latin-1'
+
+    workspace : str
+    Directory in which record files are created; the active workspace of the application if None
+
+    record_name : str
+    Base name of the record files; a unique temporary name is generated if None
+
+    record_segment_size : int
+    Size (bytes) at which the record files are closed and a new segment is started; 0 for no limit
+
+    record_segment_time : float
+    Time (seconds) after which the record files are closed and a new segment is started; 0 for no limit
+
+    record_segment_keep : int
+    Number of most recent segments kept; older segments are deleted. 0 keeps all the segments
+
+    on_display : function( text )
+    Invoked from the serial threads with the text to be displayed
+
+    on_started : function( thread )
+    Invoked from a serial thread once the port is open; thread is 0 for a connection and 1 for a playback
+
+    on_stopped : function( thread, err )
+    Invoked from a serial thread when the connection or playback terminates, with the name of the exception that
+    terminated it
+
+    play_scheduler : playbackScheduler
+    Scheduler of the last playback; its report() method describes the achieved rate and jitter
+    """
+
+    def __init__(self):
+        """
+        Class constructor; it creates the buffers and launches the record thread.
+        """
+        # PORT SETTINGS
+        self.port = '-'
+        self.baud = serial_utility.default_baud
+        self.stop_bits = '1'
+        self.parity = serial_utility.default_parity
+
+        # RECORD AND DISPLAY SETTINGS
+        self.record = 0
+        self.record_csv = 0
+        self.display_option = 1
+        self.decode_errors = appconst.default_decode_errors
+        self.spill_overflow = appconst.spill_overflow
+        self.workspace = None
+        self.record_name = None
+
+        # CALLBACKS
+        self.on_display = None
+        self.on_started = None
+        self.on_stopped = None
+
+        # SERIAL UTILITY THREAD OBJECT AND RUN FLAGS; the connection is serviced by the shared reactor
+        self.serial_thread1=None
+        self.run_serial_thread0 = 0
+        self.run_serial_thread1 = 0
+        self.play_scheduler = None
+        self.play_reader = None
+        self.play_recording = None
+        self.play_origin = 0
+
+        # CREATE BUFFERS AND OTHER VARIABLES
+        self.receive_buff = utils.spscQueue(appconst.receive_buffer_size)
+        self.send_buff = utils.spscQueue(appconst.send_buffer_size)
+        self.csv_data_var = bytearray()
+        self.csv_index = 0
+        self.hex_dumper = utils.hexDumper(appconst.hex_dump_row_width)
+
+        #overflow tier of the receive buffer; while it holds bytes, received bytes are appended to it to keep their order
+        self.spill = os_utility.spillFile()
+        self.spill_lock = threading.Lock()
+        self.text_decoder = utils.textDecoder(self.decode_errors)
+
+        #receive time of every recorded chunk and the number of bytes received up to the end of the chunk; the bytes of
+        #the chunks are kept in record_pending until the chunks are written to the recording
+        self.receive_times = collections.deque()
+        self.receive_count = 0
+        self.recorded_count = 0
+        self.record_pending = bytearray()
+        self.record_lock = threading.RLock()
+
+        #send time and bytes of every sent chunk that is yet to be written to the recording
+        self.send_times = collections.deque()
+
+        #bytes received, sent and written to the binary record file since the session was created; each counter is only
+        #incremented by one thread, the metrics are sampled from others
+        self.rx_total = 0
+        self.tx_total = 0
+        self.record_total = 0
+
+        #number of failures of the record thread, and the last of them; None until recording fails
+        self.record_errors = 0
+        self.record_error = None
+
+        #segments of the recording : the files of the first segment are named after record_base, those of the following
+        #ones after record_base and their number; record_segments holds the segments that have been finished
+        self.record_segment_size = appconst.record_segment_size
+        self.record_segment_time = appconst.record_segment_time
+        self.record_segment_keep = appconst.record_segment_keep
+        self.record_base = ""
+        self.record_segment = 1
+        self.record_segments = []
+        self.segment_start = 0
+
+        #file name of the temporary record file
+        self.record_file_name = ""
+        self.csv_record_file_name = ""
+        self.recording_file_name = ""
+
+        #writers of the temporary record files; they are open while a port is connected
+        self.record_writer = None
+        self.csv_record_writer = None
+        self.recording_writer = None
+
+        #LAUNCH THE THREADS
+        self.run_record_thread = 1
+        self.record_thread=threading.Thread(target = RECORD_THREAD, args=(self,), daemon=True)
+        self.record_thread.start()
+
+#----------------------------------------------------------------------------------------------------------------------------
+# SESSION CONTROL
+
+    def connect(self):
+        """
+        This method hands the session to the serial reactor, which connects to the port. The outcome is reported through
+        the on_started or on_stopped callback.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        serial_utility.reactor.add(self)
+
+    def disconnect(self):
+        """
+        This method signals the serial reactor to close the connection.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.run_serial_thread0 = 0
+        serial_utility.reactor.wake()
+
+    def play(self, file_name, delay, speed=None, start=0.0):
+        """
+        This method loads a play file and starts the serial thread that sends it to the port. The outcome is reported
+        through the on_started or on_stopped callback. The method raises OSError if the file can not be read and
+        ValueError if a timed replay is requested for a file that has no recording container.
+
+        PARAMETERS
+        ----------
+        file_name : str
+        Path of the file to be played
+
+        delay : float
+        Delay between sending two consecutive bytes, in milliseconds; used when speed is None
+
+        speed : float
+        If given, the received chunks of the recording container of the file are replayed with the timing they were
+        recorded with, sped up by this factor; 0 sends the file as fast as possible
+
+        start : float
+        Time (seconds) into the recording at which a timed replay starts
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        if not speed == None and speed > 0:
+            # the chunks are read from the recording container and written to the port directly
+            recording_name = record_utility.recordingFileName(file_name)
+            if not os.path.isfile(recording_name):
+                raise ValueError("no timing recorded for " + file_name)
+            self.play_recording = record_utility.recordingReader(recording_name)
+            self.play_origin = int(start * 1e9)
+            self.play_recording.seek(self.play_origin)
+        else:
+            # the file is streamed into the send buffer as the serial thread drains it
+            self.play_reader = os_utility.playFileReader(file_name)
+            self.play_reader.fill(self.send_buff)
+
+        self.play_scheduler = None
+        self.run_serial_thread1 = 1
+        self.serial_thread1 = threading.Thread(target = serial_utility.SERIAL_THREAD1, args=(self,delay,speed), daemon=True)
+        self.serial_thread1.start()
+
+    def stopPlay(self):
+        """
+        This method signals the serial thread to stop the playback.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.run_serial_thread1 = 0
+
+    def send(self, byts):
+        """
+        This method queues bytes to be sent to the connected port.
+
+        PARAMETERS
+        ----------
+        byts : byte string
+        The bytes to be sent
+
+        RETURNS : bool
+        -------
+        True : the bytes are queued
+        False : not sufficient space in the send buffer
+        """
+        return self.send_buff.enqueue(byts)
+
+    def isBusy(self):
+        """
+        This method returns whether a serial thread of the session is running.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : bool
+        -------
+        True if a connection or a playback is in progress
+        """
+        return self.run_serial_thread0 == 1 or not self.serial_thread1 == None
+
+    def close(self, remove_records=True):
+        """
+        This method closes the record files of the session, optionally deleting them, and stops its record thread. The
+        session can not be used after it has been closed.
+
+        PARAMETERS
+        ----------
+        remove_records : bool
+        If True, the record files are deleted
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.closeRecordFiles()
+        self.run_record_thread = 0
+
+        if remove_records:
+            self.removeRecordFiles()
+
+#----------------------------------------------------------------------------------------------------------------------------
+
+
+
+
+
+#----------------------------------------------------------------------------------------------------------------------------
+# RECORD FILES
+
+    def getWorkspace(self):
+        """
+        This method returns the directory in which record files are created.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : str
+        -------
+        The workspace directory, or "none" if no workspace is available
+        """
+        if self.workspace == None:
+            return os_utility.getActiveWorkspace()
+        return self.workspace
+
+    def createFileName(self):
+        """
+        This method creates a unique file name when invoked.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : str
+        -------
+        The file name, without extension
+        """
+        now = datetime.now()
+        file_name = now.strftime("temp_%d_%m_%Y_%H_%M_%S")
+        return file_name
+
+    def openRecordFiles(self):
+        """
+        This method creates new temporary record files and opens their writers; the record files of the previous
+        connection, if any, are deleted.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        # clear the recorded data upon a new connection
+        self.closeRecordFiles()
+        self.csv_data_var=bytearray()
+        self.csv_index = 0
+        self.receive_times.clear()
+        self.receive_count = 0
+        self.recorded_count = 0
+        self.record_pending.clear()
+        self.send_times.clear()
+        self.record_error = None
+
+        # if there exits a record file when a connection is made then, delete it
+        self.removeRecordFiles()
+
+        # Create a record file only when a workspace has been selected. This mechanism is fail proof because, recording
+        # can be enabled only when there is valid workspace selected and similarly record file can be created only
+        # when a valid workspace is selected. Moreover, there is data in the receive buffer only when record option is enabled.
+        # So, indirectly, there is data to record only when there is a valid workspace and hence a valid record file.
+        wrksp = self.getWorkspace()
+        if not wrksp == "none":
+            name = self.record_name
+            if name == None:
+                name = self.createFileName()
+
+            # several sessions may create record files in the same workspace within the same second
+            base = name
+            count = 1
+            while self.__segmentExists(os.path.join(wrksp, name)):
+                name = base + '_' + str(count)
+                count = count + 1
+
+            self.record_base = os.path.join(wrksp, name)
+            self.record_segment = 1
+            with self.record_lock:
+                self.__openSegment(self.record_base)
+
+    def closeRecordFiles(self):
+        """
+        This method closes the writers of the temporary record files. The data that is still waiting in the receive buffer
+        is written out first.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        deadline = time.monotonic() + appconst.record_close_timeout
+        with self.record_lock:
+            # the record thread waits for the lock, so every byte it has taken has been written and the rest is taken here
+            try:
+                while (self.receive_buff.filled or self.spill.pending) and time.monotonic() < deadline:
+                    self.recordPending()
+                self.writeRecords()
+            except Exception as e:
+                self.recordFailed(e)
+            self.__closeSegment()
+
+    def recordPending(self):
+        """
+        This method takes the bytes waiting in the receive buffer and the spill file and writes them to the record files,
+        then starts a new segment if the current one is full. It is called by the record thread, and by closeRecordFiles
+        for the bytes still waiting when the record files are closed; the caller must hold the record lock.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        # queueReceived can split a chunk between the receive buffer and the spill file, so both are read under the spill
+        # lock to take the bytes in the order they were received
+        with self.spill_lock:
+            # Chunks are noted after their bytes have been pushed into the receive buffer, so the bytes of every chunk
+            # noted so far are dequeued below
+            noted = len(self.receive_times)
+            byts = b''
+
+            avl = self.receive_buff.filled
+            if avl:
+                # Dequeue everything that is available in one call
+                byts = self.receive_buff.dequeue(avl)
+
+            # Bytes that overflowed the receive buffer are newer than the bytes in it
+            if self.spill.pending:
+                byts = byts + self.spill.read(appconst.spill_read_size)
+
+        if len(byts):
+
+            # If the binary record option is enabled
+            if self.recordAsCSV():
+
+                # Every newline completes a line; a tuple is appended to the csv list for each non empty line. The bytes
+                # after the last newline are kept in csv_data_var until the rest of their line is received.
+                lines = byts.split(b'\x0a')
+                stamp = datetime.now()
+                csv_list = []
+                for line in lines[0:-1]:
+                    self.csv_data_var += line
+                    if not len(self.csv_data_var)==0:
+                        csv_list.append( (stamp, utils.decodeText(self.csv_data_var, self.decode_errors)) )
+                        self.csv_data_var.clear()
+                self.csv_data_var += lines[-1]
+
+                writer = self.csv_record_writer
+                if len(csv_list) and not writer == None:
+                    writer.write( utils.convertToCSV(self, csv_list) )
+
+            writer = self.record_writer
+            if not writer == None:
+                writer.write(byts)
+                self.record_total = self.record_total + len(byts)
+
+        # Write the received and sent chunks to the recording
+        self.writeRecords(byts, noted)
+
+        # Start a new segment if the current one is full
+        self.rotateRecordFiles()
+
+    def removeRecordFiles(self):
+        """
+        This method deletes the record files of every segment of the last recording; the record files must be closed.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        for segment in self.recordSegments():
+            self.__removeSegment(segment)
+        self.record_segments = []
+        self.record_file_name = ""
+        self.csv_record_file_name = ""
+        self.recording_file_name = ""
+
+    def recordSegments(self):
+        """
+        This method returns the segments of the last recording, oldest first, including the one being written.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : list
+        -------
+        The paths of the segments, without extension; the record files of a segment are the path followed by '.bin',
+        '.csv', '.trm' and '.tri'
+        """
+        segments = list(self.record_segments)
+        if not self.record_file_name == "":
+            segments.append(os.path.splitext(self.record_file_name)[0])
+        return segments
+
+    def rotateRecordFiles(self):
+        """
+        This method is called by the record thread; once the record files have grown to the segment size, or have been
+        written to for the segment time, they are closed and the next segment is started. If more segments than the
+        retention limit have been written, the oldest ones are deleted.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : bool
+        -------
+        True if a new segment was started, False otherwise
+        """
+        if self.record_segment_size <= 0 and self.record_segment_time <= 0:
+            return False
+
+        with self.record_lock:
+            writers = (self.record_writer, self.csv_record_writer, self.recording_writer)
+            if self.record_writer == None:
+                return False
+
+            size = max(writer.size for writer in writers)
+            age = time.monotonic() - self.segment_start
+            if not (self.record_segment_size > 0 and size >= self.record_segment_size) and not (self.record_segment_time > 0 and age >= self.record_segment_time):
+                return False
+
+            # finalize the current segment
+            finished = os.path.splitext(self.record_file_name)[0]
+            self.__closeSegment()
+            self.record_segments.append(finished)
+
+            # the next segment is named after the first one, with its number appended
+            self.record_segment = self.record_segment + 1
+            while self.__segmentExists(self.record_base + '.' + str(self.record_segment)):
+                self.record_segment = self.record_segment + 1
+            self.__openSegment(self.record_base + '.' + str(self.record_segment))
+
+            if self.record_segment_keep > 0:
+                while len(self.record_segments) + 1 > self.record_segment_keep:
+                    self.__removeSegment(self.record_segments.pop(0))
+        return True
+
+    def __segmentExists(self, segment):
+        """
+        This private method returns whether any record file of a segment exists.
+        """
+        for ext in ('.bin', '.csv', record_utility.recording_extension, record_utility.index_extension):
+            if os.path.exists(segment + ext):
+                return True
+        return False
+
+    def __removeSegment(self, segment):
+        """
+        This private method deletes the record files of a segment.
+        """
+        for ext in ('.bin', '.csv', record_utility.recording_extension, record_utility.index_extension):
+            if os.path.exists(segment + ext):
+                os.remove(segment + ext)
+
+    def __openSegment(self, segment):
+        """
+        This private method creates the record files of a segment and opens their writers; the caller must hold the
+        record lock.
+        """
+        flnm = segment+'.bin'
+        self.record_writer = os_utility.recordWriter(flnm, True, appconst.record_buffer_size, appconst.record_flush_size, appconst.record_flush_age, appconst.record_fsync)
+        self.record_file_name = flnm
+
+        flnm = segment+'.csv'
+        self.csv_record_writer = os_utility.recordWriter(flnm, False, appconst.record_buffer_size, appconst.record_flush_size, appconst.record_flush_age, appconst.record_fsync)
+        self.csv_record_file_name = flnm
+
+        flnm = segment+record_utility.recording_extension
+        self.recording_writer = record_utility.recordingWriter(flnm, appconst.record_index_interval, appconst.record_buffer_size, appconst.record_flush_size, appconst.record_flush_age, appconst.record_fsync)
+        self.recording_file_name = flnm
+
+        self.segment_start = time.monotonic()
+
+    def __closeSegment(self):
+        """
+        This private method flushes and closes the writers of the current segment; the caller must hold the record lock.
+        """
+        for writer in (self.record_writer, self.csv_record_writer, self.recording_writer):
+            if not writer == None:
+                writer.close()
+        self.record_writer = None
+        self.csv_record_writer = None
+        self.recording_writer = None
+
+    def flushRecordFiles(self):
+        """
+        This method writes out the buffered data of the record files.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.writeRecords()
+        for writer in (self.record_writer, self.csv_record_writer, self.recording_writer):
+            if not writer == None:
+                writer.flush()
+
+#----------------------------------------------------------------------------------------------------------------------------
+
+
+
+
+
+#----------------------------------------------------------------------------------------------------------------------------
+# INTERFACE USED BY THE SERIAL THREADS
+
+    def getPortSelection(self):
+        """
+        This method returns the port of the session.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : str
+        -------
+        The name of the port
+        """
+        return self.port
+
+    def getBaudSelection(self):
+        """
+        This method returns the baud rate of the session.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : str
+        -------
+        The baud rate
+        """
+        return self.baud
+
+    def getStopBits(self):
+        """
+        This method returns the number of stop bits of the session.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : str
+        -------
+        The number of stop bits
+        """
+        return self.stop_bits
+
+    def getParity(self):
+        """
+        This method returns the parity of the session.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : str
+        -------
+        The parity type
+        """
+        return self.parity
+
+    def doRecord(self):
+        """
+        This method returns whether received data is recorded.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : int
+        -------
+        0 : recording disabled
+        1 : recoding enabled
+        """
+        return self.record
+
+    def recordAsCSV(self):
+        """
+        This method returns whether received data is recorded in csv form.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : int
+        -------
+        0 : disabled
+        1 : enabled
+        """
+        return self.record_csv
+
+    def getDisplayOption(self):
+        """
+        This method returns the form in which received data is displayed.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : int
+        -------
+        1 : ASCII
+        2 : HEX
+        3 : HEX DUMP
+        """
+        return self.display_option
+
+    def queueForDisplay(self, text):
+        """
+        This method passes received text to the on_display callback.
+
+        PARAMETERS
+        ----------
+        text : str
+        The text to be displayed
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        if not self.on_display == None:
+            self.on_display(text)
+
+    def serial0StartedClbk(self):
+        """
+        This method is called by the serial reactor when the port of the session has been opened. It raises the error if
+        the record files can not be created.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.resetBufferStats()
+        try:
+            self.openRecordFiles()
+        except Exception as e:
+            # the caller stops the session; the failure is kept for its metrics
+            self.recordFailed(e)
+            raise
+        if not self.on_started == None:
+            self.on_started(0)
+
+    def serial0StoppedClbk(self, err):
+        """
+        This method is called by the serial reactor when the connection of the session is terminated.
+
+        PARAMETERS
+        ----------
+        err : str
+        The exception that caused the termination of serial thread
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.run_serial_thread0 = 0
+        self.closeRecordFiles()
+        if not self.on_stopped == None:
+            self.on_stopped(0, err)
+
+    def queueReceived(self, byts):
+        """
+        This method is called by the serial threads to pass received bytes to the record thread. The bytes that fit are
+        pushed into the receive buffer; the rest go into the spill file if spilling is enabled, and are dropped (and
+        counted by the receive buffer) otherwise.
+
+        PARAMETERS
+        ----------
+        byts : byte string
+        The received bytes
+
+        RETURNS : bool
+        -------
+        True : all the bytes are queued for recording
+        False : some of the bytes are dropped
+        """
+        with self.spill_lock:
+            queued = 0
+            if self.spill.pending == 0:
+                # the record thread takes bytes out of the receive buffer under the spill lock, so the free space does
+                # not change until the chunk has been queued
+                free = self.receive_buff.maxSize - self.receive_buff.filled
+                if len(byts) <= free:
+                    queued = len(byts)
+                    self.receive_buff.enqueue(byts)
+                else:
+                    if free:
+                        self.receive_buff.enqueue(byts[0:free])
+                        queued = free
+                    # without spilling the rest does not fit either, and the receive buffer counts it as dropped
+                    if not self.spill_overflow:
+                        self.receive_buff.enqueue(byts[free:])
+
+            if queued < len(byts) and self.spill_overflow:
+                # bytes that overflowed are newer than those in the receive buffer, and later bytes follow them here
+                self.spill.write(byts[queued:])
+                queued = len(byts)
+
+            if queued:
+                self.recordReceived(queued)
+            return queued == len(byts)
+
+    def bufferStats(self):
+        """
+        This method returns the usage of the buffers of the session since the port was opened.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : dict
+        -------
+        'receive' and 'send' : dicts with the 'filled', 'size', 'high_water' and 'dropped' bytes of the buffers, 'spill' :
+        a dict with the 'pending', 'high_water' and 'total' bytes of the spill file
+        """
+        stats = {}
+        for name, buff in (('receive', self.receive_buff), ('send', self.send_buff)):
+            stats[name] = { 'filled' : buff.filled, 'size' : buff.maxSize, 'high_water' : buff.highWater, 'dropped' : buff.dropped }
+        stats['spill'] = { 'pending' : self.spill.pending, 'high_water' : self.spill.highWater, 'total' : self.spill.total }
+        return stats
+
+    def bufferReport(self):
+        """
+        This method returns the usage of the buffers of the session as a single line of text.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : str
+        -------
+        The usage of the buffers
+        """
+        stats = self.bufferStats()
+        text = "rx %d/%d (peak %d, dropped %d), tx %d/%d (peak %d, dropped %d)" % (
+            stats['receive']['filled'], stats['receive']['size'], stats['receive']['high_water'], stats['receive']['dropped'],
+            stats['send']['filled'], stats['send']['size'], stats['send']['high_water'], stats['send']['dropped'])
+        if stats['spill']['total']:
+            text = text + ", spilled %d (peak %d)" % (stats['spill']['total'], stats['spill']['high_water'])
+        return text
+
+    def metrics(self):
+        """
+        This method returns the runtime metrics of the session. It only reads counters and is safe to call from any thread;
+        a utility.metrics_utility.metricsSampler turns the counters into rates.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : dict
+        -------
+        'port', 'busy', the 'rx_total', 'tx_total' and 'record_total' byte counters, 'record_backlog' : bytes received
+        but not yet written to the recording, 'record_lag' : age (seconds) of the oldest of them, 'dropped' : bytes
+        dropped by the receive buffer since the port was opened, 'record_errors' and 'record_error' : the number of
+        failures to write the record files and the last of them (None if there was none), 'buffers' : the usage of the
+        buffers as returned by bufferStats()
+        """
+        stats = self.bufferStats()
+        lag = 0.0
+        try:
+            if len(self.receive_times):
+                lag = (time.monotonic_ns() - self.receive_times[0][0]) / 1e9
+        except IndexError:
+            # the record thread wrote the oldest chunk in the meantime
+            pass
+
+        return {
+            'port' : self.port,
+            'busy' : self.isBusy(),
+            'rx_total' : self.rx_total,
+            'tx_total' : self.tx_total,
+            'record_total' : self.record_total,
+            'record_backlog' : max(self.receive_count - self.recorded_count, 0),
+            'record_lag' : lag,
+            'dropped' : stats['receive']['dropped'],
+            'record_errors' : self.record_errors,
+            'record_error' : self.record_error,
+            'buffers' : stats,
+        }
+
+    def resetBufferStats(self):
+        """
+        This method is called by the serial threads once the port is open; the spill file is emptied and the usage of the
+        buffers is cleared.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        with self.spill_lock:
+            self.spill.close()
+            self.spill = os_utility.spillFile()
+        self.receive_buff.resetStats()
+        self.send_buff.resetStats()
+
+    def recordFailed(self, err):
+        """
+        This method is called by the record thread when writing the record files has failed; the error is kept for the
+        metrics of the session and printed once for as long as it repeats.
+
+        PARAMETERS
+        ----------
+        err : Exception
+        The error
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.record_errors = self.record_errors + 1
+        if not str(err) == self.record_error:
+            print('Error : ', err)
+        self.record_error = str(err)
+
+    def recordReceived(self, count):
+        """
+        This method is called by the serial threads when a received chunk has been pushed into the receive buffer; it
+        notes the time at which the chunk was received.
+
+        PARAMETERS
+        ----------
+        count : int
+        The number of bytes in the chunk
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.receive_count = self.receive_count + count
+        self.receive_times.append( (time.monotonic_ns(), self.receive_count) )
+
+    def recordSent(self, byts):
+        """
+        This method is called by the serial threads when bytes have been written to the port; if recording is enabled it
+        notes the time at which they were sent.
+
+        PARAMETERS
+        ----------
+        byts : byte string
+        The bytes written to the port
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.tx_total = self.tx_total + len(byts)
+        if self.doRecord():
+            self.send_times.append( (time.monotonic_ns(), bytes(byts)) )
+
+    def writeRecords(self, byts=b'', noted=None):
+        """
+        This method is called by the record thread to write the received and sent chunks to the recording, in the order
+        of their times.
+
+        PARAMETERS
+        ----------
+        byts : byte string
+        The bytes dequeued from the receive buffer
+
+        noted : int
+        The number of received chunks noted before the bytes were dequeued; all the noted chunks if None
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        with self.record_lock:
+            self.record_pending += byts
+            if noted == None:
+                noted = len(self.receive_times)
+
+            received = []
+            position = 0
+            for i in range(noted):
+                stamp, end = self.receive_times[0]
+                length = end - self.recorded_count
+                if position + length > len(self.record_pending):
+                    break
+                self.receive_times.popleft()
+                received.append( (stamp, record_utility.RX, bytes(self.record_pending[position : position + length])) )
+                position = position + length
+                self.recorded_count = end
+            del self.record_pending[0:position]
+
+            sent = []
+            for i in range(len(self.send_times)):
+                stamp, payload = self.send_times.popleft()
+                sent.append( (stamp, record_utility.TX, payload) )
+
+            writer = self.recording_writer
+            if not writer == None:
+                for stamp, direction, payload in heapq.merge(received, sent):
+                    writer.write(stamp, direction, payload)
+
+    def nextPlayChunk(self):
+        """
+        This method is called by serial thread 1 during a timed replay to get the next received chunk of the recording.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : tuple
+        -------
+        ( time in nanoseconds since the start of the replay, bytes of the chunk ), or None at the end of the recording
+        """
+        if self.play_recording == None:
+            return None
+        chunk = self.play_recording.next(record_utility.RX)
+        if chunk == None:
+            return None
+        return (max(chunk[0] - self.play_origin, 0), chunk[2])
+
+    def refillSendBuffer(self):
+        """
+        This method is called by serial thread 1 to move the next part of the play file into the send buffer.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : int
+        -------
+        The number of bytes moved into the send buffer
+        """
+        if self.play_reader == None:
+            return 0
+        return self.play_reader.fill(self.send_buff)
+
+    def serial1StartedClbk(self):
+        """
+        This method is called by serial thread 1 when it has started successfully.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.resetBufferStats()
+        try:
+            self.openRecordFiles()
+        except Exception as e:
+            # the caller stops the session; the failure is kept for its metrics
+            self.recordFailed(e)
+            raise
+        if not self.on_started == None:
+            self.on_started(1)
+
+    def serial1StoppedClbk(self, err):
+        """
+        This method is called by serial thread 1 when it is terminated.
+
+        PARAMETERS
+        ----------
+        err : str
+        The exception that caused the termination of the serial thread
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.serial_thread1 = None
+        self.run_serial_thread1 = 0
+        if not self.play_reader == None:
+            self.play_reader.close()
+            self.play_reader = None
+            # drop the rest of an interrupted playback
+            self.send_buff.flush()
+        if not self.play_recording == None:
+            self.play_recording.close()
+            self.play_recording = None
+        self.closeRecordFiles()
+        if not self.on_stopped == None:
+            self.on_stopped(1, err)
+
+#----------------------------------------------------------------------------------------------------------------------------
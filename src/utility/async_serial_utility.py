@@ -0,0 +1,332 @@
+"""
+This module contains an asyncio front end for serial ports. The port's file descriptor is watched by the event loop, so a
+single thread can drive any number of ports concurrently, with the usual asyncio cancellation and timeouts
+(e.g. asyncio.wait_for). It requires a platform where serial ports have a file descriptor (POSIX).
+"""
+
+__author__ = "ASHUTOSH SINGH PARMAR"
+
+import asyncio
+import os
+
+from utility import serial_utility
+
+# default maximum number of received bytes buffered by a port before reading from the device is paused
+default_limit = 65536
+
+# number of bytes requested from the device on every read
+read_size = 65536
+
+async def openSerialPort(port, baud=serial_utility.default_baud, stop_bits='1', parity=serial_utility.default_parity, limit=default_limit):
+    """
+    This coroutine opens a serial port and returns an asyncSerialPort bound to the running event loop.
+
+    PARAMETERS
+    ----------
+    port : str
+    Name of the port
+
+    baud : str or int
+    The baud rate
+
+    stop_bits : str or int
+    The number of stop bits
+
+    parity : str
+    The parity type : 'None', 'Odd' or 'Even'
+
+    limit : int
+    Maximum number of received bytes buffered before reading from the device is paused
+
+    RETURNS : asyncSerialPort
+    -------
+    The opened port
+    """
+    device = serial_utility.openDevice(port, baud, stop_bits, parity)
+    try:
+        return asyncSerialPort(device, limit)
+    except Exception:
+        device.close()
+        raise
+
+class asyncSerialPort:
+    """
+    This class wraps an opened serial port for use from asyncio code. Received bytes are read by the event loop as soon
+    as the port becomes readable and buffered until they are consumed by one of the read methods. Only one coroutine
+    should read from a port at a time.
+
+    Methods
+    -------
+
+    read()
+    This coroutine returns received bytes
+
+    readexactly()
+    This coroutine returns an exact number of received bytes
+
+    readuntil()
+    This coroutine returns the received bytes up to and including a separator
+
+    readline()
+    This coroutine returns the received bytes up to and including a newline
+
+    write()
+    This coroutine writes bytes to the port
+
+    close()
+    This method closes the port
+    """
+
+    def __init__(self, device, limit=default_limit):
+        """
+        The class constructor; it must be called from a coroutine running in the event loop that will use the port.
+
+        PARAMETERS
+        ----------
+        device : serial.Serial object
+        The opened serial port, in non blocking mode
+
+        limit : int
+        Maximum number of received bytes buffered before reading from the device is paused
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.device = device
+        self.__fd = device.fileno()
+        self.__loop = asyncio.get_running_loop()
+        self.__limit = limit
+        self.__buffer = bytearray()
+        self.__waiter = None
+        self.__writable = None
+        self.__exception = None
+        self.__reading = False
+        self.closed = False
+        self.__resumeReading()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __resumeReading(self):
+        """
+        This private method registers the port with the event loop for reading.
+        """
+        if not self.__reading and not self.closed and self.__exception == None:
+            self.__loop.add_reader(self.__fd, self.__onReadable)
+            self.__reading = True
+
+    def __pauseReading(self):
+        """
+        This private method stops the event loop from reading the port.
+        """
+        if self.__reading:
+            self.__loop.remove_reader(self.__fd)
+            self.__reading = False
+
+    def __wakeup(self):
+        """
+        This private method wakes up the coroutine waiting for received bytes, if any.
+        """
+        waiter = self.__waiter
+        if not waiter == None and not waiter.done():
+            waiter.set_result(None)
+
+    def __onWritable(self):
+        """
+        This private method is invoked by the event loop when the port is writable; it wakes up the waiting write once.
+        """
+        self.__loop.remove_writer(self.__fd)
+        writable = self.__writable
+        if not writable == None and not writable.done():
+            writable.set_result(None)
+
+    def __onReadable(self):
+        """
+        This private method is invoked by the event loop when the port is readable.
+        """
+        try:
+            data = os.read(self.__fd, read_size)
+        except BlockingIOError:
+            return
+        except OSError as e:
+            data = b''
+            self.__exception = e
+
+        if len(data) == 0:
+            # the device has gone away
+            if self.__exception == None:
+                self.__exception = ConnectionError("serial port closed")
+            self.__pauseReading()
+        else:
+            self.__buffer += data
+            if len(self.__buffer) >= self.__limit:
+                self.__pauseReading()
+        self.__wakeup()
+
+    async def __waitForData(self):
+        """
+        This private coroutine waits until more bytes are received; it raises the error of the port if there is one.
+        """
+        if not self.__exception == None:
+            raise self.__exception
+        if self.closed:
+            raise ConnectionError("serial port closed")
+
+        self.__resumeReading()
+        self.__waiter = self.__loop.create_future()
+        try:
+            await self.__waiter
+        finally:
+            self.__waiter = None
+
+    def __consume(self, count):
+        """
+        This private method removes and returns the oldest 'count' buffered bytes.
+        """
+        data = bytes(self.__buffer[0:count])
+        del self.__buffer[0:count]
+        if len(self.__buffer) < self.__limit:
+            self.__resumeReading()
+        return data
+
+    async def read(self, n=-1):
+        """
+        This coroutine waits until at least one byte has been received and returns the buffered bytes.
+
+        PARAMETERS
+        ----------
+        n : int
+        Maximum number of bytes to return; all the buffered bytes are returned if negative
+
+        RETURNS : bytes
+        -------
+        The received bytes
+        """
+        if n == 0:
+            return b''
+        while len(self.__buffer) == 0:
+            await self.__waitForData()
+        if n < 0:
+            n = len(self.__buffer)
+        return self.__consume(n)
+
+    async def readexactly(self, n):
+        """
+        This coroutine waits until 'n' bytes have been received and returns them.
+
+        PARAMETERS
+        ----------
+        n : int
+        Number of bytes to return
+
+        RETURNS : bytes
+        -------
+        The received bytes
+        """
+        while len(self.__buffer) < n:
+            await self.__waitForData()
+        return self.__consume(n)
+
+    async def readuntil(self, separator=b'\n'):
+        """
+        This coroutine waits until 'separator' has been received and returns the received bytes up to and including it.
+        asyncio.LimitOverrunError is raised if the buffer fills up before the separator is found; the bytes are left in
+        the buffer.
+
+        PARAMETERS
+        ----------
+        separator : bytes
+        The byte sequence to wait for
+
+        RETURNS : bytes
+        -------
+        The received bytes, ending with the separator
+        """
+        start = 0
+        while True:
+            pos = self.__buffer.find(separator, start)
+            if pos >= 0:
+                return self.__consume(pos + len(separator))
+
+            if len(self.__buffer) >= self.__limit:
+                raise asyncio.LimitOverrunError("separator not found before the buffer limit", len(self.__buffer))
+
+            # only the bytes received from now on, plus a possible partial separator, need to be searched again
+            start = max(len(self.__buffer) - len(separator) + 1, 0)
+            await self.__waitForData()
+
+    async def readline(self):
+        """
+        This coroutine waits until a newline has been received and returns the line, including the newline.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : bytes
+        -------
+        The received line
+        """
+        return await self.readuntil(b'\n')
+
+    async def write(self, data):
+        """
+        This coroutine writes bytes to the port, waiting for the port to become writable whenever its output buffer is
+        full; it returns when all the bytes have been handed to the driver.
+
+        PARAMETERS
+        ----------
+        data : bytes-like object
+        The bytes to be written
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        view = memoryview(data).cast('B')
+        while len(view):
+            if self.closed:
+                raise ConnectionError("serial port closed")
+            try:
+                count = os.write(self.__fd, view)
+            except BlockingIOError:
+                count = 0
+            view = view[count:]
+
+            if len(view):
+                self.__writable = self.__loop.create_future()
+                self.__loop.add_writer(self.__fd, self.__onWritable)
+                try:
+                    await self.__writable
+                finally:
+                    self.__writable = None
+                    if not self.closed:
+                        self.__loop.remove_writer(self.__fd)
+
+    def close(self):
+        """
+        This method closes the port; a coroutine waiting for received bytes or for the port to take written bytes gets a
+        ConnectionError.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        if self.closed:
+            return
+        self.__pauseReading()
+        self.__loop.remove_writer(self.__fd)
+        self.closed = True
+        self.device.close()
+        self.__wakeup()
+        writable = self.__writable
+        if not writable == None and not writable.done():
+            writable.set_result(None)
@@ -0,0 +1,301 @@
+"""
+This module contains the runtime metrics of the application. The sessions only keep plain counters, which the serial and
+record threads increment as they move data; the classes here turn periodic samples of those counters into rates and
+publish them as JSON, to a file or to a local datagram socket, for monitoring scripts.
+"""
+
+__author__ = "ASHUTOSH SINGH PARMAR"
+
+import json
+import os
+import socket
+import threading
+import time
+from datetime import datetime
+
+# counters of a session and the names of the rates computed from them
+rate_counters = { 'rx_total' : 'rx_rate', 'tx_total' : 'tx_rate', 'record_total' : 'record_rate' }
+
+def formatRate(rate):
+    """
+    This function formats a byte rate for display.
+
+    PARAMETERS
+    ----------
+    rate : float
+    Bytes per second
+
+    RETURNS : str
+    -------
+    The rate with a unit
+    """
+    if rate >= 1e6:
+        return "%.2f MB/s" % (rate / 1e6)
+    if rate >= 1e3:
+        return "%.1f kB/s" % (rate / 1e3)
+    return "%d B/s" % rate
+
+def metricsReport(metrics):
+    """
+    This function returns the metrics of a session, as sampled by a metricsSampler, as a single line of text.
+
+    PARAMETERS
+    ----------
+    metrics : dict
+    The sampled metrics of the session
+
+    RETURNS : str
+    -------
+    The metrics
+    """
+    receive = metrics['buffers']['receive']
+    text = "rx %s | tx %s | rx buffer %d%% | record lag %.2f s (%d B) | dropped %d" % (
+        formatRate(metrics['rx_rate']), formatRate(metrics['tx_rate']), receive['filled'] * 100 // max(receive['size'], 1),
+        metrics['record_lag'], metrics['record_backlog'], metrics['dropped'])
+    if not metrics['record_error'] == None:
+        text = text + " | record error : " + metrics['record_error']
+    if 'display_queue' in metrics:
+        text = text + " | display queue %d chars (peak %d, dropped %d)" % (metrics['display_queue'], metrics['display_queue_peak'],
+                                                                     metrics['display_dropped'])
+    if not metrics.get('play_report') == None:
+        text = text + " | last playback : " + metrics['play_report']
+    return text
+
+class metricsSampler:
+    """
+    This class adds rates to the metrics of sessions : every sample is compared with the previous sample of the same
+    session. Every consumer of the metrics uses its own sampler, so that their sampling intervals do not interfere.
+
+    Methods
+    -------
+
+    sample()
+    This method adds the rates to the metrics of a session
+
+    forget()
+    This method drops the previous sample of a session
+    """
+
+    def __init__(self):
+        """
+        The class constructor.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.__last = {}
+
+    def sample(self, key, metrics):
+        """
+        This method adds the byte rates since the previous sample of a session to its metrics.
+
+        PARAMETERS
+        ----------
+        key : object
+        Identifies the session
+
+        metrics : dict
+        The metrics of the session, as returned by SerialSession.metrics()
+
+        RETURNS : dict
+        -------
+        The metrics, with a rate for every counter of rate_counters
+        """
+        now = time.monotonic()
+        last = self.__last.get(key)
+        for counter, rate in rate_counters.items():
+            metrics[rate] = 0.0
+            if not last == None and now > last[0]:
+                metrics[rate] = max(metrics[counter] - last[1][counter], 0) / (now - last[0])
+        self.__last[key] = (now, { counter : metrics[counter] for counter in rate_counters })
+        return metrics
+
+    def forget(self, key):
+        """
+        This method drops the previous sample of a session that no longer exists.
+
+        PARAMETERS
+        ----------
+        key : object
+        Identifies the session
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.__last.pop(key, None)
+
+def METRICS_THREAD(publisher):
+    """
+    This function runs as a separate thread. It periodically collects the metrics and publishes them.
+
+    PARAMETERS
+    ----------
+    publisher : metricsPublisher
+
+    RETURNS
+    -------
+    NOTHING
+    """
+    while not publisher.stopped.wait(publisher.interval):
+        try:
+            publisher.publish()
+        except Exception as e:
+            print('Error : ', e)
+
+class metricsPublisher:
+    """
+    This class periodically writes the metrics of the sessions as a JSON document. The target is either a file, which is
+    replaced as a whole on every update so that readers never see a partial document, or a local datagram socket given as
+    'udp:HOST:PORT' or 'unix:PATH', which receives one datagram per update. Updates that can not be delivered, e.g.
+    because nothing is listening on the socket, are dropped.
+
+    Attributes
+    ----------
+    target : str
+    Where the metrics are written
+
+    interval : float
+    Time (seconds) between two updates
+
+    Methods
+    -------
+
+    start()
+    This method starts the thread publishing the metrics
+
+    publish()
+    This method collects and publishes the metrics once
+
+    forget()
+    This method drops a session that no longer exists
+
+    stop()
+    This method stops the thread
+    """
+
+    def __init__(self, target, interval, collect):
+        """
+        The class constructor; it opens the socket if the target is one.
+
+        PARAMETERS
+        ----------
+        target : str
+        A file path, 'udp:HOST:PORT' or 'unix:PATH'
+
+        interval : float
+        Time (seconds) between two updates
+
+        collect : function()
+        Returns a list of ( key, metrics ) tuples, one for every session, as returned by SerialSession.metrics()
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.target = target
+        self.interval = interval
+        self.stopped = threading.Event()
+        self.__collect = collect
+        self.__sampler = metricsSampler()
+        self.__lock = threading.Lock()
+        self.__socket = None
+        self.__address = None
+        self.__thread = None
+
+        if target.startswith('udp:'):
+            host, port = target[4:].rsplit(':', 1)
+            self.__address = (host, int(port))
+            self.__socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        elif target.startswith('unix:'):
+            self.__address = target[5:]
+            self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+
+    def start(self):
+        """
+        This method starts the thread publishing the metrics.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.__thread = threading.Thread(target=METRICS_THREAD, args=(self,), daemon=True)
+        self.__thread.start()
+
+    def publish(self):
+        """
+        This method collects the metrics of the sessions and publishes them once.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        sessions = []
+        with self.__lock:
+            for key, metrics in self.__collect():
+                sessions.append( self.__sampler.sample(key, metrics) )
+        document = json.dumps({ 'time' : datetime.now().isoformat(timespec='milliseconds'), 'sessions' : sessions })
+
+        if self.__socket == None:
+            temp_name = self.target + '.tmp'
+            with open(temp_name, 'w') as fl:
+                fl.write(document + '\n')
+            os.replace(temp_name, self.target)
+            return
+
+        try:
+            self.__socket.sendto(document.encode(), self.__address)
+        except OSError:
+            pass
+
+    def forget(self, key):
+        """
+        This method drops the previous sample of a session that has been closed; the session must no longer be returned
+        by the collect function.
+
+        PARAMETERS
+        ----------
+        key : object
+        Identifies the session
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        # waits for a publication in progress, which may still include the session
+        with self.__lock:
+            self.__sampler.forget(key)
+
+    def stop(self):
+        """
+        This method stops the thread, publishes the final metrics and closes the socket.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.stopped.set()
+        if not self.__thread == None:
+            self.__thread.join()
+            self.__thread = None
+            self.publish()
+        if not self.__socket == None:
+            self.__socket.close()
+            self.__socket = None
@@ -6,6 +6,10 @@ __author__ = "ASHUTOSH SINGH PARMAR"
 
 import os
 import json
+import mmap
+import tempfile
+import threading
+import time
 
 #data file name
 data_file = 'saved_data.json'
@@ -78,4 +82,467 @@ def updateWorkspace(workspace_dir):
     saved_data['workspace'] = workspace_dir
     with open(data_file, 'w') as fl:
         fl.write( json.dumps(saved_data) )
-            
\ No newline at end of file
+            
+def copyFile(source, destination, size=None, progress=None, chunk_size=1048576):
+    """
+    This function copies a file without reading it into memory : the copy is done by the kernel with copy_file_range or
+    sendfile where they are available, and with fixed size reads and writes otherwise. Only the first 'size' bytes are
+    copied, so a file that is still being appended to can be copied up to a known point.
+
+    PARAMETERS
+    ----------
+    source : str
+    Path of the file to be copied
+
+    destination : str
+    Path of the copy; it is created or truncated
+
+    size : int
+    Number of bytes to copy; the whole file if None
+
+    progress : function( count )
+    Called with the number of bytes copied so far after every chunk
+
+    chunk_size : int
+    Number of bytes copied at a time
+
+    RETURNS : int
+    -------
+    The number of bytes copied
+    """
+    with open(source, 'rb') as src, open(destination, 'wb') as dst:
+        if size == None:
+            size = os.fstat(src.fileno()).st_size
+
+        copied = 0
+        fast = hasattr(os, 'copy_file_range') or hasattr(os, 'sendfile')
+        while copied < size:
+            count = min(chunk_size, size - copied)
+            done = 0
+            if fast:
+                try:
+                    if hasattr(os, 'copy_file_range'):
+                        done = os.copy_file_range(src.fileno(), dst.fileno(), count, copied, copied)
+                    else:
+                        done = os.sendfile(dst.fileno(), src.fileno(), copied, count)
+                except OSError:
+                    # e.g. file systems or platforms that do not support the call; fall back to reads and writes
+                    fast = False
+                    dst.seek(copied)
+
+            if not fast:
+                src.seek(copied)
+                byts = src.read(count)
+                dst.write(byts)
+                done = len(byts)
+
+            # the file is shorter than expected
+            if done == 0:
+                break
+            copied = copied + done
+            if not progress == None:
+                progress(copied)
+    return copied
+
+class spillFile:
+    """
+    This class implements an unbounded first in first out store of bytes kept in an anonymous temporary file. It takes
+    the bytes that do not fit into a full receive buffer, so that they are recorded once the record thread catches up.
+    The file is created when the first bytes are written and emptied whenever all its bytes have been read.
+
+    Attributes
+    ----------
+    pending : int
+    The number of bytes written and not yet read
+
+    total : int
+    The number of bytes written since the store was created
+
+    highWater : int
+    The largest number of bytes the store has held
+
+    Methods
+    -------
+
+    write()
+    This method appends bytes to the store
+
+    read()
+    This method removes and returns the oldest bytes of the store
+
+    close()
+    This method deletes the temporary file
+    """
+
+    def __init__(self, directory=None):
+        """
+        The class constructor.
+
+        PARAMETERS
+        ----------
+        directory : str
+        Directory in which the temporary file is created; the system temporary directory if None
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.directory = directory
+        self.pending = 0
+        self.total = 0
+        self.highWater = 0
+        self.__file = None
+        self.__read_pos = 0
+        self.__write_pos = 0
+        self.__lock = threading.Lock()
+
+    def write(self, byts):
+        """
+        This method appends bytes to the store.
+
+        PARAMETERS
+        ----------
+        byts : bytes-like object
+        The bytes to be stored
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        with self.__lock:
+            if self.__file == None:
+                self.__file = tempfile.TemporaryFile(dir=self.directory)
+            self.__file.seek(self.__write_pos)
+            self.__file.write(byts)
+            self.__write_pos = self.__write_pos + len(byts)
+            self.pending = self.pending + len(byts)
+            self.total = self.total + len(byts)
+            if self.pending > self.highWater:
+                self.highWater = self.pending
+
+    def read(self, size=-1):
+        """
+        This method removes and returns the oldest bytes of the store; the file is emptied once all its bytes are read.
+
+        PARAMETERS
+        ----------
+        size : int
+        The maximum number of bytes to return; all the stored bytes if negative
+
+        RETURNS : bytes
+        -------
+        The bytes, empty if the store is empty
+        """
+        with self.__lock:
+            if self.pending == 0:
+                return b''
+            if size < 0 or size > self.pending:
+                size = self.pending
+            self.__file.seek(self.__read_pos)
+            byts = self.__file.read(size)
+            self.__read_pos = self.__read_pos + len(byts)
+            self.pending = self.pending - len(byts)
+            if self.pending == 0:
+                self.__file.seek(0)
+                self.__file.truncate()
+                self.__read_pos = 0
+                self.__write_pos = 0
+            return byts
+
+    def close(self):
+        """
+        This method deletes the temporary file; the stored bytes are lost.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        with self.__lock:
+            if not self.__file == None:
+                self.__file.close()
+                self.__file = None
+            self.pending = 0
+            self.__read_pos = 0
+            self.__write_pos = 0
+
+class recordWriter:
+    """
+    This class implements a long lived writer for a record file. The file is opened once and kept open; written data is
+    buffered and handed to the operating system when enough data has accumulated or when the oldest unflushed data gets
+    too old, whichever comes first. Optionally every flush is followed by an fsync, so that all the writes accumulated
+    since the previous flush are committed to the disk together.
+
+    Attributes
+    ----------
+    fileName : str
+    Path of the record file
+
+    closed : bool
+    True once the writer has been closed
+
+    size : int
+    Number of bytes (characters for text files) written to the record file
+
+    Methods
+    -------
+
+    write()
+    This method writes data to the record file
+
+    poll()
+    This method flushes the record file if the oldest unflushed data is older than the flush age
+
+    flush()
+    This method flushes the buffered data to the record file
+
+    close()
+    This method flushes and closes the record file
+    """
+
+    def __init__(self, file_name, binary=True, buffer_size=65536, flush_size=32768, flush_age=1.0, fsync=False):
+        """
+        The class constructor; it creates (or truncates) the record file.
+
+        PARAMETERS
+        ----------
+        file_name : str
+        Path of the record file
+
+        binary : bool
+        True if bytes are written to the file, False if strings are written
+
+        buffer_size : int
+        Size of the write buffer in bytes
+
+        flush_size : int
+        The buffered data is flushed once this many bytes (characters for text files) are pending
+
+        flush_age : float
+        The buffered data is flushed once the oldest pending data is this many seconds old
+
+        fsync : bool
+        If True, every flush is committed to the disk with os.fsync
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.fileName = file_name
+        self.closed = False
+        self.__flush_size = flush_size
+        self.__flush_age = flush_age
+        self.__fsync = fsync
+        self.__pending = 0
+        self.__oldest = 0
+        self.size = 0
+        self.__lock = threading.Lock()
+        if binary:
+            self.__file = open(file_name, 'wb', buffering=buffer_size)
+        else:
+            self.__file = open(file_name, 'w', buffering=buffer_size)
+
+    def write(self, data):
+        """
+        This method writes data to the record file. It raises ValueError if the writer has been closed.
+
+        PARAMETERS
+        ----------
+        data : bytes or str
+        The data to be written
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        with self.__lock:
+            if self.closed:
+                raise ValueError("write to a closed record file : " + self.fileName)
+            if len(data) == 0:
+                return
+            self.__file.write(data)
+            self.size = self.size + len(data)
+            if self.__pending == 0:
+                self.__oldest = time.monotonic()
+            self.__pending = self.__pending + len(data)
+            if self.__pending >= self.__flush_size:
+                self.__flush()
+
+    def poll(self):
+        """
+        This method flushes the record file if the oldest unflushed data is older than the flush age. It should be called
+        periodically by the thread that writes to the file.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        with self.__lock:
+            if self.__pending and time.monotonic() - self.__oldest >= self.__flush_age:
+                self.__flush()
+
+    def flush(self):
+        """
+        This method flushes the buffered data to the record file.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        with self.__lock:
+            self.__flush()
+
+    def close(self):
+        """
+        This method flushes and closes the record file.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        with self.__lock:
+            if self.closed:
+                return
+            self.__flush()
+            self.__file.close()
+            self.closed = True
+
+    def __flush(self):
+        """
+        This private method flushes the buffered data; the caller must hold the writer lock.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        if self.closed:
+            return
+        self.__file.flush()
+        if self.__fsync:
+            os.fsync(self.__file.fileno())
+        self.__pending = 0
+
+class playFileReader:
+    """
+    This class streams a play file into a send buffer. The file is memory mapped, so files of any size are played using
+    constant memory : the send buffer is refilled from the mapping as the serial thread drains it.
+
+    Attributes
+    ----------
+    fileName : str
+    Path of the play file
+
+    size : int
+    Size of the play file in bytes
+
+    position : int
+    Number of bytes handed to the send buffer so far
+
+    Methods
+    -------
+
+    fill()
+    This method moves as many bytes from the file into a send buffer as fit
+
+    remaining()
+    This method returns the number of bytes yet to be handed to the send buffer
+
+    close()
+    This method closes the play file
+    """
+
+    def __init__(self, file_name):
+        """
+        The class constructor; it opens and maps the play file. OSError is raised if the file can not be read.
+
+        PARAMETERS
+        ----------
+        file_name : str
+        Path of the play file
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.fileName = file_name
+        self.position = 0
+        self.__map = None
+        self.__view = b''
+        with open(file_name, 'rb') as fl:
+            self.size = os.fstat(fl.fileno()).st_size
+            # empty files can not be mapped
+            if self.size:
+                self.__map = mmap.mmap(fl.fileno(), 0, access=mmap.ACCESS_READ)
+                self.__view = memoryview(self.__map)
+                self.size = len(self.__map)
+
+    def remaining(self):
+        """
+        This method returns the number of bytes yet to be handed to the send buffer.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : int
+        -------
+        The number of bytes
+        """
+        return self.size - self.position
+
+    def fill(self, buff):
+        """
+        This method moves as many bytes from the file into the send buffer as fit into it.
+
+        PARAMETERS
+        ----------
+        buff : buffer class object
+        The send buffer
+
+        RETURNS : int
+        -------
+        The number of bytes moved
+        """
+        count = min(buff.maxSize - buff.filled, self.size - self.position)
+        if count > 0 and buff.enqueue(self.__view[self.position : self.position + count]):
+            self.position = self.position + count
+            return count
+        return 0
+
+    def close(self):
+        """
+        This method closes the play file.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        if not self.__map == None:
+            self.__view.release()
+            self.__map.close()
+            self.__map = None
+            self.__view = b''
+            self.position = self.size
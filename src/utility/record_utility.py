@@ -0,0 +1,380 @@
+"""
+This module contains the recording container of the application. A recording is kept in two append only files :
+
+    .trm : a 16 byte header (magic and wall clock start time) followed by one record per chunk of data. Every record is a
+           13 byte header (monotonic time in nanoseconds, direction, payload length) followed by the payload.
+
+    .tri : a sparse index of the .trm file; an entry (time, offset of the record) is added for the first record and then
+           for the first record of every index interval. A position in time is found with a binary search of the index
+           followed by a short scan of the .trm file.
+
+Both files are only ever appended to, so a recording that was cut short (e.g. by a crash) stays readable up to its last
+complete record.
+"""
+
+__author__ = "ASHUTOSH SINGH PARMAR"
+
+import mmap
+import os
+import struct
+import time
+
+from utility import os_utility
+
+# Extensions of the recording container and of its index
+recording_extension = '.trm'
+index_extension = '.tri'
+
+# Identifies a recording container, and the version of its layout
+recording_magic = b'TERMAN\x00\x01'
+
+# Layout of the header of a recording : magic, wall clock time (nanoseconds since the epoch) at which it was created
+recording_header = struct.Struct('<8sQ')
+
+# Layout of the header of a record : monotonic time (nanoseconds) of the chunk, direction, length of the payload
+record_header = struct.Struct('<QBI')
+
+# Layout of an index entry : monotonic time (nanoseconds) of a record, offset of the record in the recording
+index_entry = struct.Struct('<QQ')
+
+# Directions of a record
+RX = 0
+TX = 1
+
+def recordingFileName(file_name):
+    """
+    This function returns the name of the recording container that belongs to a record file.
+
+    PARAMETERS
+    ----------
+    file_name : str
+    Path of the record file
+
+    RETURNS : str
+    -------
+    Path of the recording container
+    """
+    return os.path.splitext(file_name)[0] + recording_extension
+
+def indexFileName(file_name):
+    """
+    This function returns the name of the index that belongs to a recording container.
+
+    PARAMETERS
+    ----------
+    file_name : str
+    Path of the recording container
+
+    RETURNS : str
+    -------
+    Path of the index
+    """
+    return os.path.splitext(file_name)[0] + index_extension
+
+class recordingWriter:
+    """
+    This class appends records to a recording container and maintains its index. The two files are written through
+    recordWriter objects, so they are buffered and flushed in the same way as the other record files.
+
+    Attributes
+    ----------
+    fileName : str
+    Path of the recording container
+
+    indexFileName : str
+    Path of the index
+
+    closed : bool
+    True once the writer has been closed
+
+    size : int
+    Size of the recording container in bytes
+
+    Methods
+    -------
+
+    write()
+    This method appends a record
+
+    poll()
+    This method flushes the files if their oldest unflushed data is older than the flush age
+
+    flush()
+    This method flushes the buffered data to the files
+
+    close()
+    This method flushes and closes the files
+    """
+
+    def __init__(self, file_name, index_interval=1.0, buffer_size=65536, flush_size=32768, flush_age=1.0, fsync=False):
+        """
+        The class constructor; it creates (or truncates) the recording container and its index.
+
+        PARAMETERS
+        ----------
+        file_name : str
+        Path of the recording container
+
+        index_interval : float
+        Minimum time (seconds) between two index entries
+
+        buffer_size, flush_size, flush_age, fsync
+        Buffering of the files, as for recordWriter
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.fileName = file_name
+        self.indexFileName = indexFileName(file_name)
+        self.closed = False
+        self.__interval = int(index_interval * 1e9)
+        self.__next_index = None
+        self.size = recording_header.size
+
+        self.__data = os_utility.recordWriter(file_name, True, buffer_size, flush_size, flush_age, fsync)
+        self.__index = os_utility.recordWriter(self.indexFileName, True, buffer_size, flush_size, flush_age, fsync)
+        self.__data.write(recording_header.pack(recording_magic, time.time_ns()))
+
+    def write(self, stamp, direction, payload):
+        """
+        This method appends a record; records are expected in the order of their times. It raises ValueError if the
+        writer has been closed.
+
+        PARAMETERS
+        ----------
+        stamp : int
+        Monotonic time of the chunk in nanoseconds (time.monotonic_ns)
+
+        direction : int
+        RX or TX
+
+        payload : bytes-like object
+        The bytes of the chunk
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        if self.closed:
+            raise ValueError("write to a closed recording : " + self.fileName)
+
+        if self.__next_index == None or stamp >= self.__next_index:
+            self.__index.write(index_entry.pack(stamp, self.size))
+            self.__next_index = stamp + self.__interval
+
+        self.__data.write(record_header.pack(stamp, direction, len(payload)) + payload)
+        self.size = self.size + record_header.size + len(payload)
+
+    def poll(self):
+        """
+        This method flushes the files if their oldest unflushed data is older than the flush age.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.__data.poll()
+        self.__index.poll()
+
+    def flush(self):
+        """
+        This method flushes the buffered data to the files; the recording is flushed before its index, so that the
+        index never points past the end of the recording.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.__data.flush()
+        self.__index.flush()
+
+    def close(self):
+        """
+        This method flushes and closes the files.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.closed = True
+        self.__data.close()
+        self.__index.close()
+
+class recordingReader:
+    """
+    This class reads the records of a recording container. The container is memory mapped and its index is read whole,
+    so seeking to a time takes a binary search of the index and a scan of at most one index interval of records.
+    OSError is raised if the container can not be read and ValueError if it is not a recording container.
+
+    Attributes
+    ----------
+    fileName : str
+    Path of the recording container
+
+    startTime : int
+    Wall clock time (nanoseconds since the epoch) at which the recording was created
+
+    Methods
+    -------
+
+    seek()
+    This method moves to the first record at or after a time
+
+    next()
+    This method returns the next record
+
+    close()
+    This method closes the recording container
+    """
+
+    def __init__(self, file_name):
+        """
+        The class constructor; it opens the recording container and reads its index.
+
+        PARAMETERS
+        ----------
+        file_name : str
+        Path of the recording container
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.fileName = file_name
+        self.__map = None
+        self.__view = b''
+        with open(file_name, 'rb') as fl:
+            if os.fstat(fl.fileno()).st_size < recording_header.size:
+                raise ValueError("not a recording : " + file_name)
+            self.__map = mmap.mmap(fl.fileno(), 0, access=mmap.ACCESS_READ)
+            self.__view = memoryview(self.__map)
+
+        magic, self.startTime = recording_header.unpack_from(self.__map, 0)
+        if not magic == recording_magic:
+            self.close()
+            raise ValueError("not a recording : " + file_name)
+
+        # a missing index only makes seeking slower
+        self.__index = b''
+        try:
+            with open(indexFileName(file_name), 'rb') as fl:
+                self.__index = fl.read()
+        except OSError:
+            pass
+        self.__entries = len(self.__index) // index_entry.size
+
+        self.__offset = recording_header.size
+        self.__first_time = None
+        record = self.__recordAt(self.__offset)
+        if not record == None:
+            self.__first_time = record[0]
+
+    def __recordAt(self, offset):
+        """
+        This private method returns the header of the record at an offset, or None if there is no complete record there.
+        """
+        if offset + record_header.size > len(self.__view):
+            return None
+        stamp, direction, length = record_header.unpack_from(self.__view, offset)
+        if offset + record_header.size + length > len(self.__view):
+            return None
+        return (stamp, direction, length)
+
+    def seek(self, time_ns):
+        """
+        This method moves to the first record received or sent at or after a time.
+
+        PARAMETERS
+        ----------
+        time_ns : int
+        Time since the first record, in nanoseconds
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.__offset = recording_header.size
+        if self.__first_time == None:
+            return
+        target = self.__first_time + time_ns
+
+        # binary search for the last index entry at or before the target
+        low = 0
+        high = self.__entries
+        while low < high:
+            middle = (low + high) // 2
+            stamp, offset = index_entry.unpack_from(self.__index, middle * index_entry.size)
+            if stamp <= target:
+                low = middle + 1
+            else:
+                high = middle
+        if low:
+            stamp, offset = index_entry.unpack_from(self.__index, (low - 1) * index_entry.size)
+            if offset < len(self.__view):
+                self.__offset = offset
+
+        # scan the records of the index interval
+        while True:
+            record = self.__recordAt(self.__offset)
+            if record == None or record[0] >= target:
+                break
+            self.__offset = self.__offset + record_header.size + record[2]
+
+    def next(self, direction=None):
+        """
+        This method returns the next record and moves past it.
+
+        PARAMETERS
+        ----------
+        direction : int
+        If given, records of the other direction are skipped
+
+        RETURNS : tuple
+        -------
+        ( time since the first record in nanoseconds, direction, payload as a memoryview ), or None at the end of the
+        recording
+        """
+        while True:
+            record = self.__recordAt(self.__offset)
+            if record == None:
+                return None
+            stamp, record_direction, length = record
+            start = self.__offset + record_header.size
+            self.__offset = start + length
+            if direction == None or record_direction == direction:
+                return (stamp - self.__first_time, record_direction, self.__view[start : start + length])
+
+    def close(self):
+        """
+        This method closes the recording container; the payloads returned by next() can not be used afterwards.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        if not self.__map == None:
+            try:
+                self.__view.release()
+                self.__map.close()
+            except BufferError:
+                # a payload is still referenced; the mapping is closed once it is garbage collected
+                pass
+            self.__map = None
+            self.__view = b''
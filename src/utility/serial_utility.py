@@ -4,7 +4,9 @@ This module contains utility functions for performing serial port related tasks
 
 __author__ = "ASHUTOSH SINGH PARMAR"
 
-from datetime import datetime
+import os
+import select
+import threading
 import serial
 import serial.tools.list_ports
 import time
@@ -64,146 +66,739 @@ def SERIAL_PARITY(parity):
     else:
         return 'N'
 
-run_serial_thread0 = 0
-def SERIAL_THREAD0(app):
+# Maximum time (seconds) for which the reactor sleeps waiting for activity before it re-checks the run flags
+wait_timeout = 0.1
+
+# Polling interval (seconds) used on platforms where the ports can not be waited upon with select
+poll_interval = 0.0005
+
+# Time (nanoseconds) before a playback deadline below which the playback thread spins instead of sleeping; sleeping is
+# only accurate to about a scheduler tick
+spin_threshold_ns = 1000000
+
+# Gap (nanoseconds) between two sends from which on the playback thread only sleeps; the overshoot of a sleep is small
+# against such gaps, and spinning through part of every gap would cost a good share of a core at low rates
+no_spin_gap_ns = 2000000
+
+# Largest part of a shorter gap that the playback thread spends spinning
+spin_gap_fraction = 0.25
+
+# Longest time (nanoseconds) for which the playback thread sleeps before it services the received data again
+max_sleep_ns = 10000000
+
+# Number of bytes the playback thread keeps queued in the driver's output buffer when playing without delay
+play_chunk_size = 4096
+
+# Number of queued output bytes below which the playback thread refills the driver's output buffer
+play_low_water = 1024
+
+def openDevice(port, baud, stop_bits, parity):
     """
-    This thread handles the communication with serial device.
+    This function opens a serial port in non blocking mode.
 
     PARAMETERS
     ----------
-    app : App class object
-    This object is used for interacting with the user interface
+    port : str
+    Name of the port
 
-    RETURNS
+    baud : str or int
+    The baud rate
+
+    stop_bits : str or int
+    The number of stop bits
+
+    parity : str
+    The parity type : 'None', 'Odd' or 'Even'
+
+    RETURNS : serial.Serial
     -------
-    NOTHING
+    The opened port
     """
-
     # creating an object of the serial.Serial class
     device = serial.Serial()
-
     try:
-        device.port = app.getPortSelection()
-        device.baudrate = int(app.getBaudSelection())
-        device.stopbits = int(app.getStopBits())
-        device.parity=SERIAL_PARITY(app.getParity())
+        device.port = port
+        device.baudrate = int(baud)
+        device.stopbits = int(stop_bits)
+        device.parity=SERIAL_PARITY(parity)
         device.timeout=0
         device.open()
+    except Exception:
+        device.close()
+        raise
+    return device
+
+def openPort(session):
+    """
+    This function opens the serial port described by the settings of a session.
+
+    PARAMETERS
+    ----------
+    session : SerialSession class object
+    The session whose port is to be opened
+
+    RETURNS : serial.Serial
+    -------
+    The opened port, in non blocking mode
+    """
+    return openDevice(session.getPortSelection(), session.getBaudSelection(), session.getStopBits(), session.getParity())
+
+def processReceived(session, byts):
+    """
+    This function passes bytes received on the port of a session to its recorder and to its display.
+
+    PARAMETERS
+    ----------
+    session : SerialSession class object
+    The session that received the bytes
+
+    byts : byte string
+    The received bytes
 
-        app.send_buff.flush()
-        app.receive_buff.flush()
+    RETURNS
+    -------
+    NOTHING
+    """
+    session.rx_total = session.rx_total + len(byts)
 
-        # signal the successful initialization to the user interface
-        app.serial0StartedClbk()
+    if session.doRecord():
+        session.queueReceived(byts)
 
-        temp = 0
-        byts = b''
+    if session.getDisplayOption() == 2:
+        session.queueForDisplay( utils.convertToHexString(byts) )
+    elif session.getDisplayOption() == 3:
+        session.queueForDisplay( session.hex_dumper.format(byts) )
+    elif session.getDisplayOption() == 1:
+        session.queueForDisplay( session.text_decoder.decode(byts, session.decode_errors) )
+
+class serialReactor:
+    """
+    This class multiplexes the connections of any number of sessions on a single thread. The thread sleeps until one of
+    the ports has received bytes or until it is woken up, e.g. when data is pushed into the send buffer of a session or a
+    session is disconnected. On POSIX systems it selects on the file descriptors of the ports together with a wake up pipe,
+    so idle ports cost no CPU at all. Elsewhere it falls back to short sleeps on an event.
+
+    Writes never block the reactor thread : the bytes a port can not take at once are kept for the session, and the port
+    is waited on for writing until they are sent. Meanwhile the send buffer of the session fills up, which holds back its
+    producer.
+
+    A session is connected with add(); the port is opened by the reactor thread, which then invokes the
+    serial0StartedClbk() method of the session. Clearing the run_serial_thread0 flag of the session, or an error on its
+    port, closes the port and invokes the serial0StoppedClbk() method of the session.
+
+    Methods
+    -------
+
+    add()
+    This method connects a session
+
+    wake()
+    This method wakes up the reactor thread
+    """
+
+    def __init__(self):
+        """
+        The class constructor; the reactor thread is launched when the first session is added.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.__lock = threading.Lock()
+        self.__pending = []
+        self.__devices = {}
+        self.__unsent = {}
+        self.__thread = None
+        self.__event = threading.Event()
+        self.__pipe = None
+        if os.name == 'posix':
+            self.__pipe = os.pipe()
+            os.set_blocking(self.__pipe[0], False)
+            os.set_blocking(self.__pipe[1], False)
+
+    def add(self, session):
+        """
+        This method connects a session; the outcome is reported through the callbacks of the session.
+
+        PARAMETERS
+        ----------
+        session : SerialSession class object
+        The session to be connected
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        session.run_serial_thread0 = 1
+        with self.__lock:
+            self.__pending.append(session)
+            if self.__thread == None:
+                self.__thread = threading.Thread(target = self.__run, daemon=True)
+                self.__thread.start()
+        self.wake()
+
+    def wake(self):
+        """
+        This method wakes up the reactor thread; it is safe to call from any thread.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.__event.set()
+        if not self.__pipe == None:
+            try:
+                os.write(self.__pipe[1], b'\x00')
+            except (BlockingIOError, OSError):
+                pass
+
+    def __run(self):
+        """
+        This private method is the body of the reactor thread.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        readable = None
+        while True:
+            # an unexpected error must not stop the service of the other ports
+            try:
+                self.__openPending()
+
+                for session, (device, fd) in list(self.__devices.items()):
+                    try:
+                        if session.run_serial_thread0 == 0:
+                            raise SerialTermination("terminate thread")
+
+                        # If there is data in the uart send buffer then keep sending the bytes to the serial buffer;
+                        # the bytes the port does not take are sent before any newer ones
+                        byts = self.__unsent.pop(session, b'')
+                        if len(byts) == 0 and session.send_buff.filled:
+                            byts = session.send_buff.dequeue(session.send_buff.filled)
+                        if len(byts):
+                            count = self.__write(device, fd, byts)
+                            if count:
+                                session.recordSent(byts[:count])
+                            if count < len(byts):
+                                self.__unsent[session] = byts[count:]
+
+                        # If there is data in the uart receive buffer then pass it into the receive buffer
+                        if readable == None or fd in readable:
+                            temp = device.in_waiting
+                            if temp:
+                                processReceived(session, device.read(temp))
+
+                    except Exception as e:
+                        self.__close(session, str(e.__class__.__name__))
+
+                readable = self.__wait()
+
+            except Exception as e:
+                print('Error : ', e)
+                # every port is checked on the next pass, so a port that caused the error is closed there
+                readable = None
+                time.sleep(poll_interval)
+
+    def __openPending(self):
+        """
+        This private method opens the ports of the sessions added since the last call.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        with self.__lock:
+            pending = self.__pending
+            self.__pending = []
+
+        for session in pending:
+            try:
+                device = openPort(session)
+            except Exception as e:
+                session.run_serial_thread0 = 0
+                threading.Thread(target = session.serial0StoppedClbk, args=(str(e.__class__.__name__),), daemon=True).start()
+                continue
+
+            fd = None
+            if not self.__pipe == None:
+                try:
+                    fd = device.fileno()
+                    os.set_blocking(fd, False)
+                except Exception:
+                    fd = None
+            if fd == None:
+                # writes return as soon as the driver has queued what it can take
+                device.write_timeout = 0
+
+            session.send_buff.flush()
+            session.receive_buff.flush()
+            session.hex_dumper.reset()
+            session.text_decoder.reset()
+            session.send_buff.setNotifier(self.wake)
+            self.__devices[session] = (device, fd)
+
+            # signal the successful initialization to the session; if the session can not start (e.g. its record files
+            # can not be created) its port is closed again and the failure is reported, the other ports are still opened
+            try:
+                session.serial0StartedClbk()
+            except Exception as e:
+                session.run_serial_thread0 = 0
+                self.__close(session, str(e.__class__.__name__))
+
+    def __close(self, session, err):
+        """
+        This private method closes the port of a session and reports the termination to the session. The session's
+        callback may wait for its recorder, so it is invoked from a separate thread to keep the other ports serviced.
+
+        PARAMETERS
+        ----------
+        session : SerialSession class object
+        The session to be disconnected
+
+        err : str
+        Name of the exception that terminated the connection
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        device, fd = self.__devices.pop(session)
+        self.__unsent.pop(session, None)
+        session.send_buff.setNotifier(None)
+        try:
+            device.close()
+        except Exception:
+            pass
+        threading.Thread(target = session.serial0StoppedClbk, args=(err,), daemon=True).start()
+
+    def __write(self, device, fd, byts):
+        """
+        This private method writes as many bytes to a port as it takes without blocking.
+
+        PARAMETERS
+        ----------
+        device : serial.Serial
+        The port
+
+        fd : int
+        The file descriptor of the port, or None if it has none
+
+        byts : byte string
+        The bytes to be written
+
+        RETURNS : int
+        -------
+        The number of bytes written
+        """
+        if fd == None:
+            count = device.write(byts)
+            return len(byts) if count == None else count
+        try:
+            return os.write(fd, byts)
+        except BlockingIOError:
+            return 0
+
+    def __wait(self):
+        """
+        This private method blocks until a port has bytes waiting or can take the bytes left unsent, the reactor is woken
+        up or the wait timeout expires.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : set
+        -------
+        The file descriptors of the readable ports, or None if every port has to be checked
+        """
+        fds = [ fd for device, fd in self.__devices.values() ]
+        if not self.__pipe == None and not None in fds:
+            writable = [ self.__devices[session][1] for session in self.__unsent ]
+            readable, writable, _ = select.select(fds + [self.__pipe[0]], writable, [], wait_timeout)
+            if self.__pipe[0] in readable:
+                try:
+                    while os.read(self.__pipe[0], 512):
+                        pass
+                except (BlockingIOError, OSError):
+                    pass
+            self.__event.clear()
+            return set(readable)
+
+        # Some port has no file descriptor to wait on; sleep in short steps so that latency stays below a millisecond
+        deadline = time.perf_counter() + wait_timeout
         while True:
+            if self.__event.is_set():
+                break
+            if any( device.in_waiting for device, fd in list(self.__devices.values()) ):
+                break
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            self.__event.wait(min(poll_interval, remaining))
+            # the bytes left unsent are retried after every step
+            if len(self.__unsent):
+                break
+        self.__event.clear()
+        return None
+
+# The reactor shared by all the sessions of the process
+reactor = serialReactor()
+
+class playbackScheduler:
+    """
+    This class paces the playback of a file. The deadline of every send is computed from the start time, so the error in
+    one wait does not add up over the playback. The end of a wait is spent spinning on time.perf_counter_ns, the rest is
+    slept through. The spin is limited to the spin threshold and to a spin_gap_fraction of the gap since the previous
+    send, and left out for gaps of no_spin_gap_ns and more, so slow playbacks cost next to no CPU. The lateness of every
+    send is recorded for the statistics.
 
-            # If there is data in the uart send buffer then keep sending the bytes to the serial buffer
-            temp = app.send_buff.filled
-            if temp:
-                device.write(app.send_buff.dequeue(temp))
-            
-            # If there is data in the uart receive buffer then pass it into the receive buffer
-            temp = device.in_waiting
-            if temp:
-                byts = device.read(temp)
-
-                if app.doRecord():
-                    app.receive_buff.enqueue(byts)
-
-                if app.getDisplayOption() == 2:
-                    app.putOnDisplay( utils.convertToHexString(byts) )
-                    app.scroll()
-                else:
-                    app.putOnDisplay( byts.decode() )
-                    app.scroll()
-            
-            if run_serial_thread0 == 0:
-                raise SerialTermination("terminate thread")
+    Methods
+    -------
 
-    except Exception as e:
-        # signal the termination to the user interface
-        app.serial0StoppedClbk(str(e.__class__.__name__))
-        device.close()
+    start()
+    This method starts the schedule
+
+    schedule()
+    This method sets the deadline of the next send
+
+    wait()
+    This method waits until the next send is due
+
+    sent()
+    This method records a send and moves to the next deadline
 
-run_serial_thread1 = 0
-def SERIAL_THREAD1(app, delay):
+    finish()
+    This method records the end of the playback
+
+    stats()
+    This method returns the statistics of the playback
+
+    report()
+    This method returns the statistics of the playback as text
+    """
+
+    def __init__(self, interval_ns, spin_ns=spin_threshold_ns):
+        """
+        The class constructor.
+
+        PARAMETERS
+        ----------
+        interval_ns : int
+        The time between two consecutive sends, in nanoseconds
+
+        spin_ns : int
+        The longest time spent spinning before a send, in nanoseconds; 0 never spins
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.interval = int(interval_ns)
+        self.spin = int(spin_ns)
+        self.start()
+
+    def start(self):
+        """
+        This method (re)starts the schedule; the first send is due immediately.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.start_time = time.perf_counter_ns()
+        self.end_time = self.start_time
+        self.count = 0
+        self.bytes = 0
+        self.deadline = self.start_time
+        self.late_sum = 0
+        self.late_square_sum = 0
+        self.late_max = 0
+
+    def wait(self, idle=None):
+        """
+        This method returns when the next send is due.
+
+        PARAMETERS
+        ----------
+        idle : function
+        Called, at least every max_sleep_ns, while the method sleeps
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        spin = 0
+        gap = self.deadline - self.end_time
+        if gap < no_spin_gap_ns:
+            spin = min(self.spin, int(gap * spin_gap_fraction))
+
+        while True:
+            remaining = self.deadline - time.perf_counter_ns()
+            if remaining <= spin:
+                break
+            if not idle == None:
+                idle()
+                remaining = self.deadline - time.perf_counter_ns()
+            if remaining > spin:
+                time.sleep(min(remaining - spin, max_sleep_ns) / 1e9)
+
+        while time.perf_counter_ns() < self.deadline:
+            pass
+
+    def schedule(self, offset_ns):
+        """
+        This method sets the deadline of the next send, relative to the start of the schedule.
+
+        PARAMETERS
+        ----------
+        offset_ns : int
+        Time of the next send after the start, in nanoseconds
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.deadline = self.start_time + offset_ns
+
+    def sent(self, count=1):
+        """
+        This method records a send made at the current deadline and moves the deadline one interval forward.
+
+        PARAMETERS
+        ----------
+        count : int
+        The number of bytes sent
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        now = time.perf_counter_ns()
+        late = now - self.deadline
+        self.late_sum = self.late_sum + late
+        self.late_square_sum = self.late_square_sum + late * late
+        if late > self.late_max:
+            self.late_max = late
+
+        self.end_time = now
+        self.count = self.count + 1
+        self.bytes = self.bytes + count
+        if self.interval == 0:
+            self.deadline = now
+        else:
+            self.deadline = self.start_time + self.count * self.interval
+
+    def finish(self):
+        """
+        This method records the end of the playback, when it is later than the last send (e.g. once the last bytes have
+        left the driver's output buffer).
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.end_time = time.perf_counter_ns()
+
+    def stats(self):
+        """
+        This method returns the statistics of the playback.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : dict
+        -------
+        'sends' and 'bytes' : the number of sends and bytes sent, 'duration' : seconds from the start to the end of the
+        playback, 'rate' and 'target_rate' : achieved and requested sends per second (0 when unlimited), 'byte_rate' :
+        achieved bytes per second, 'jitter_mean',
+        'jitter_stdev' and 'jitter_max' : lateness of the sends in microseconds
+        """
+        duration = (self.end_time - self.start_time) / 1e9
+        mean = 0
+        stdev = 0
+        if self.count:
+            mean = self.late_sum / self.count
+            stdev = max(self.late_square_sum / self.count - mean * mean, 0) ** 0.5
+
+        return {
+            'sends' : self.count,
+            'bytes' : self.bytes,
+            'duration' : duration,
+            'rate' : (self.count - 1) / duration if self.count > 1 and duration > 0 else 0,
+            'target_rate' : 1e9 / self.interval if self.interval else 0,
+            'byte_rate' : self.bytes / duration if duration > 0 else 0,
+            'jitter_mean' : mean / 1000,
+            'jitter_stdev' : stdev / 1000,
+            'jitter_max' : self.late_max / 1000
+        }
+
+    def report(self):
+        """
+        This method returns the statistics of the playback as a single line of text.
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS : str
+        -------
+        The statistics
+        """
+        st = self.stats()
+        target = "unlimited" if st['target_rate'] == 0 else "%.1f/s" % st['target_rate']
+        return "played %d bytes in %.3f s (%.0f B/s) : %.1f sends/s (target %s), jitter mean %.1f us, stdev %.1f us, max %.1f us" % (
+            st['bytes'], st['duration'], st['byte_rate'], st['rate'], target, st['jitter_mean'], st['jitter_stdev'],
+            st['jitter_max'])
+
+def SERIAL_THREAD1(session, delay, speed=None):
     """
     This thread handles the communication with the selected serial device. It runs as a separate thread.
     This thread is run when a record file is to be played.
 
     PARAMETERS
     ----------
-    app : App class object
-    This object is used for interacting with the user interface
+    session : SerialSession class object
+    This object holds the port settings and buffers, and is informed about received data and state changes
 
     delay : float
-    Delay between sending two consecutive bytes
+    Delay between sending two consecutive bytes, in milliseconds; with 0 the data is written in chunks that keep the
+    driver's output buffer filled, so it is sent at the line rate
+
+    speed : float
+    If given, every received chunk of the recording container of the file is sent at the time it was received, relative
+    to the start of the replay, divided by this factor; 0 sends the file as fast as possible, as with a delay of 0
 
     RETURNS
     -------
     NOTHING
     """
-    # creating an object of the serial.Serial class
-    device = serial.Serial()
+    device = None
 
     try:
-        device.port = app.getPortSelection()
-        device.baudrate = int(app.getBaudSelection())
-        device.stopbits = int(app.getStopBits())
-        device.parity=SERIAL_PARITY(app.getParity())
-        device.timeout=0
-        device.open()
+        device = openPort(session)
 
-        # signal the successful initialization to the user interface
-        app.serial1StartedClbk()
+        session.hex_dumper.reset()
+        session.text_decoder.reset()
 
-        # convert the delay to seconds
-        delay=delay/1000
+        # signal the successful initialization to the session
+        session.serial1StartedClbk()
 
-        # time at which the thread was started
-        start_time = datetime.now()
+        if speed == 0:
+            delay = 0
+        elif not speed == None:
+            delay = -1
 
-        temp = 0
-        byts = b''
-        interval = 0
-        while True:
-            
-            # If there is data in the uart send buffer then keep sending the bytes to the serial buffer
-            temp = app.send_buff.filled
-            now = datetime.now()
-            if temp and (now-start_time).total_seconds() >= delay:
-                start_time = now
-                device.write(app.send_buff.dequeue(1))
-            
+        # the delay is given in milliseconds; timed replays schedule every chunk themselves
+        scheduler = playbackScheduler(max(delay, 0) * 1000000)
+        session.play_scheduler = scheduler
+
+        def receive():
             # If there is data in the uart receive buffer then pass it into the receive buffer
             temp = device.in_waiting
             if temp:
-                byts = device.read(temp)
-
-                if app.doRecord():
-                    app.receive_buff.enqueue(byts)
-
-                if app.getDisplayOption() == 2:
-                    app.putOnDisplay( utils.convertToHexString(byts) )
-                    app.scroll()
-                else:
-                    app.putOnDisplay( byts.decode() )
-                    app.scroll()
-            
-            if run_serial_thread1 == 0 or app.send_buff.filled ==0:
+                processReceived(session, device.read(temp))
+
+        # time (seconds) taken to send one byte, with a start bit, 8 data bits and a stop bit
+        byte_time = 10 / device.baudrate
+
+        while delay < 0:
+            if session.run_serial_thread1 == 0:
+                raise SerialTermination("terminate thread")
+
+            chunk = session.nextPlayChunk()
+            if chunk == None:
                 raise SerialTermination("terminate thread")
 
+            stamp, byts = chunk
+            scheduler.schedule(int(stamp / speed))
+            scheduler.wait(receive)
+
+            # the lateness of the chunk is measured when it is handed to the driver
+            scheduler.sent(len(byts))
+            device.write(byts)
+            session.recordSent(byts)
+
+            receive()
+
+        while delay == 0:
+            if session.run_serial_thread1 == 0:
+                raise SerialTermination("terminate thread")
+
+            session.refillSendBuffer()
+            if session.send_buff.filled == 0:
+                # wait for the last bytes to leave the driver's output buffer
+                while device.out_waiting and session.run_serial_thread1:
+                    receive()
+                    time.sleep(min(max(device.out_waiting * byte_time, poll_interval), wait_timeout))
+                scheduler.finish()
+                raise SerialTermination("terminate thread")
+
+            # top the driver's output buffer up to play_chunk_size bytes, refilling the send buffer from the play file
+            queued = device.out_waiting
+            if queued < play_low_water:
+                while queued < play_chunk_size and session.send_buff.filled:
+                    chunk = session.send_buff.dequeue(min(play_chunk_size - queued, session.send_buff.filled))
+                    device.write(chunk)
+                    session.recordSent(chunk)
+                    scheduler.sent(len(chunk))
+                    queued = queued + len(chunk)
+                    session.refillSendBuffer()
+
+            receive()
+
+            # sleep for a part of the time the output buffer takes to drain to the low water mark at the baud rate;
+            # devices that do not pace their output by the baud rate drain sooner
+            time.sleep(min(max((queued - play_low_water) * byte_time / 4, poll_interval), wait_timeout))
+
+        while True:
+            session.refillSendBuffer()
+            if session.run_serial_thread1 == 0 or session.send_buff.filled ==0:
+                raise SerialTermination("terminate thread")
+
+            scheduler.wait(receive)
+            byts = session.send_buff.dequeue(1)
+            device.write(byts)
+            session.recordSent(byts)
+            scheduler.sent()
+
+            receive()
+
     except Exception as e:
-        # signal the termination to the user interface
-        app.serial1StoppedClbk(str(e.__class__.__name__))
-        device.close()
+        if not device == None:
+            device.close()
+
+        # signal the termination to the session
+        session.serial1StoppedClbk(str(e.__class__.__name__))
 
 # Custom Exception class
 class SerialTermination(Exception):
     """
-    This is a custom exception used in the serial thread
+    This is a custom exception used in the serial threads
     """
     pass
\ No newline at end of file
@@ -4,7 +4,10 @@ This module contains utility functions that are used by application
 
 __author__ = "ASHUTOSH SINGH PARMAR"
 
+import codecs
 import time
+import threading
+from collections import deque
 from datetime import datetime, timedelta
 
 tz = -time.timezone
@@ -17,7 +20,10 @@ else:
 
 def convertToByteString(inputStr):
     """
-    This utility function accepts a string of hex values and returns a sequence of bytes corresponding to it.
+    This utility function accepts a string of hex values and returns a sequence of bytes corresponding to it. The values
+    may be separated by any whitespace (including newlines) and commas, and may carry a '0x' prefix; a single digit value
+    stands for one byte. The whole input is converted by a single bytes.fromhex call, so the result is built in one
+    allocation.
     The function raises an exception if the input string is not in the corect format
 
     PARAMETERS
@@ -29,33 +35,257 @@ def convertToByteString(inputStr):
     -------
     The byte sequence corresponding to the input string
     """
-    if len(inputStr)==0:
-        return b''
-    else:
-        valueList = inputStr.split(' ')
-        bytstr = b''
-        for val in valueList:
-            bytstr = bytstr + bytearray.fromhex(val)
-        return bytstr
-
-def convertToHexString(inputByts):
+    # normalise every separator to a single space so that a '0x' prefix always follows a space
+    text = ' ' + ' '.join( inputStr.replace(',', ' ').split() )
+    text = text.replace(' 0x', ' ').replace(' 0X', ' ')
+
+    # bytes.fromhex accepts whitespace between byte pairs, which covers well formed input without looping in python
+    try:
+        return bytes.fromhex(text)
+    except ValueError:
+        pass
+
+    # otherwise single digit values have to be padded, and values with an odd number of digits are rejected
+    tokens = text.split()
+    for i, val in enumerate(tokens):
+        if len(val) % 2:
+            if len(val) == 1:
+                tokens[i] = '0' + val
+            else:
+                raise ValueError("invalid hex value '" + val + "'")
+    return bytes.fromhex( "".join(tokens) )
+
+def convertToHexString(inputByts, offset=None, row_width=16):
     """
     This utililty function accepts a squence of bytes (a byte array) and returns a string containing HEX values
-    corresponding to the input sequence of bytes
+    corresponding to the input sequence of bytes. Every byte is rendered as a fixed width, upper case pair of hex digits
+    followed by a space. If an offset is provided the output is laid out like a classic hexdump instead : rows of
+    'row_width' bytes, each prefixed by the offset of its first byte.
 
     PARAMETERS
     ---------
     iputByts : byte array
     Input byte array
 
+    offset : int
+    Offset of the first input byte; if None, no offset column is added and the output is a single line
+
+    row_width : int
+    Number of bytes per row when an offset column is added
+
     RETURNS : str
     ------- 
     A string containing HEX values corresponding to the input bytes
     """
-    st = ""
-    for byt in inputByts:
-        st = st + hex(byt) + " "
-    return st
+    if len(inputByts) == 0:
+        return ""
+
+    if offset == None:
+        return bytes(inputByts).hex(' ').upper() + ' '
+
+    view = memoryview(inputByts).cast('B')
+    rows = []
+    for pos in range(0, len(view), row_width):
+        rows.append( hex_offset_format % (offset + pos) + view[pos : pos + row_width].hex(' ').upper() + '\n' )
+    return "".join(rows)
+
+# format of the offset column of the hexdump view
+hex_offset_format = "%08X  "
+
+class hexDumper:
+    """
+    This class renders a stream of byte chunks as a hexdump : rows of a fixed number of bytes, each prefixed by the offset
+    of its first byte. Rows are continued across chunks, so a chunk is displayed as soon as it is received even when it
+    does not fill a row.
+
+    Attributes
+    ----------
+    offset : int
+    Offset of the next byte to be rendered
+
+    rowWidth : int
+    Number of bytes per row
+
+    Methods
+    -------
+
+    format()
+    This method renders a chunk of bytes
+
+    reset()
+    This method restarts the dump at offset 0
+    """
+
+    def __init__(self, row_width=16):
+        """
+        The class constructor
+
+        PARAMETERS
+        ----------
+        row_width : int
+        Number of bytes per row
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.rowWidth = row_width
+        self.offset = 0
+
+    def format(self, inputByts):
+        """
+        This method renders a chunk of bytes; the returned text continues the text returned for the previous chunk.
+
+        PARAMETERS
+        ----------
+        inputByts : byte array
+        The chunk of bytes
+
+        RETURNS : str
+        -------
+        The hexdump text for the chunk
+        """
+        view = memoryview(inputByts).cast('B')
+        parts = []
+        pos = 0
+        while pos < len(view):
+            column = self.offset % self.rowWidth
+            if column == 0:
+                parts.append( ('\n' if self.offset else '') + hex_offset_format % self.offset )
+            count = min(self.rowWidth - column, len(view) - pos)
+            parts.append( view[pos : pos + count].hex(' ').upper() + ' ' )
+            pos = pos + count
+            self.offset = self.offset + count
+        return "".join(parts)
+
+    def reset(self):
+        """
+        This method restarts the dump at offset 0
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.offset = 0
+
+def decodeAsLatin1(err):
+    """
+    This function is a codecs error handler : bytes that are not valid UTF-8 are decoded as latin-1, one character per
+    byte.
+
+    PARAMETERS
+    ----------
+    err : UnicodeDecodeError
+    The decoding error
+
+    RETURNS : tuple
+    -------
+    ( replacement text, position at which decoding resumes )
+    """
+    return (err.object[err.start:err.end].decode('latin-1'), err.end)
+
+codecs.register_error('terman-latin1', decodeAsLatin1)
+
+# codecs error handlers corresponding to the decode error options : 'replace' shows invalid bytes as U+FFFD, 'escape'
+# shows them as \xNN and 'latin-1' decodes them as latin-1 characters
+decode_error_handlers = { 'replace' : 'replace', 'escape' : 'backslashreplace', 'latin-1' : 'terman-latin1' }
+
+# List of decode error options
+decode_error_list = ['replace', 'escape', 'latin-1']
+
+def decodeText(byts, errors='replace'):
+    """
+    This function decodes a complete piece of UTF-8 text; invalid bytes are handled as described by the errors option, so
+    the function never fails.
+
+    PARAMETERS
+    ----------
+    byts : byte array
+    The bytes to be decoded
+
+    errors : str
+    A decode error option : 'replace', 'escape' or 'latin-1'
+
+    RETURNS : str
+    -------
+    The decoded text
+    """
+    return bytes(byts).decode('utf-8', decode_error_handlers[errors])
+
+class textDecoder:
+    """
+    This class decodes a stream of UTF-8 byte chunks. A character whose bytes are split across two chunks is kept until
+    its last byte is received, and invalid bytes are handled as described by the errors option, so decoding never fails.
+
+    Attributes
+    ----------
+    errors : str
+    The decode error option : 'replace', 'escape' or 'latin-1'
+
+    Methods
+    -------
+
+    decode()
+    This method decodes a chunk of bytes
+
+    reset()
+    This method discards an incomplete character kept from the previous chunk
+    """
+
+    def __init__(self, errors='replace'):
+        """
+        The class constructor
+
+        PARAMETERS
+        ----------
+        errors : str
+        The decode error option : 'replace', 'escape' or 'latin-1'
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.errors = errors
+        self.__decoder = codecs.getincrementaldecoder('utf-8')(decode_error_handlers[errors])
+
+    def decode(self, inputByts, errors=None):
+        """
+        This method decodes a chunk of bytes; the returned text continues the text returned for the previous chunk.
+
+        PARAMETERS
+        ----------
+        inputByts : byte array
+        The chunk of bytes
+
+        errors : str
+        If given, the decode error option to be used from now on
+
+        RETURNS : str
+        -------
+        The decoded text
+        """
+        if not errors == None and not errors == self.errors:
+            self.errors = errors
+            self.__decoder.errors = decode_error_handlers[errors]
+        return self.__decoder.decode(inputByts)
+
+    def reset(self):
+        """
+        This method discards an incomplete character kept from the previous chunk
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.__decoder.reset()
 
 def convertToCSV(app, data):
     """
@@ -71,19 +301,191 @@ def convertToCSV(app, data):
     NOTHING
     """
 
-    csv_str = ""
+    # the rows are joined once at the end; appending them to a growing string copies it for every row
+    rows = []
     index = app.csv_index
     for item in data :
-        csv_str = csv_str + str(index) + ';' + item[0].strftime("%Y-%m-%dT%H:%M:%S") + utc_off + ";" + item[1] +'\n'
+        rows.append( str(index) + ';' + item[0].strftime("%Y-%m-%dT%H:%M:%S") + utc_off + ";" + item[1] +'\n' )
         index = index + 1
     app.csv_index = index
 
-    return csv_str 
+    return "".join(rows)
+
+
+class scrollbackStore:
+    """
+    This class keeps the text trimmed from the top of the display area so that it can be paged through later. Text is
+    stored in the blocks in which it was trimmed, which keeps the per line overhead low; once the store holds more than
+    its maximum number of lines or characters the oldest blocks are discarded, so its memory use stays bounded. Lines
+    longer than the line width, e.g. the text of the HEX display which has no line breaks, are stored as several lines of
+    the line width, so that appending never has to rebuild a long unfinished line.
+
+    Attributes
+    ----------
+    maxLines : int
+    The maximum number of lines held by the store
+
+    maxChars : int
+    The maximum number of characters held by the store
+
+    lineWidth : int
+    The maximum length of a stored line
+
+    lines : int
+    The number of lines currently held by the store
+
+    chars : int
+    The number of characters currently held by the store, not counting the unfinished last line
+
+    Methods
+    -------
+
+    append()
+    This method appends a block of text to the store
+
+    getLines()
+    This method returns a range of lines from the store
+
+    flush()
+    This method empties the store
+    """
+
+    def __init__(self, max_lines, max_chars, line_width):
+        """
+        The class constructor
+
+        PARAMETERS
+        ----------
+        max_lines : int
+        The maximum number of lines held by the store
+
+        max_chars : int
+        The maximum number of characters held by the store
+
+        line_width : int
+        The maximum length of a stored line; longer lines are split
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.maxLines = max_lines
+        self.maxChars = max_chars
+        self.lineWidth = line_width
+        self.lines = 0
+        self.chars = 0
+        self.__blocks = deque()
+        self.__block_chars = deque()
+        self.__partial = ""
+
+    def append(self, text):
+        """
+        This method appends a block of text to the store; the text does not need to end at a line boundary. The cost of a
+        call is proportional to the length of the text.
+
+        PARAMETERS
+        ----------
+        text : str
+        The text to be appended
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        # the unfinished line is always shorter than the line width, so prefixing it is cheap
+        text = self.__partial + text
+        cut = text.rfind('\n') + 1
+        block = text[0:cut].splitlines(keepends=True)
+        partial = text[cut:]
+
+        width = self.lineWidth
+        if any( len(line) > width for line in block ):
+            block = [ line[i : i + width] for line in block for i in range(0, len(line), width) ]
+        if len(partial) >= width:
+            whole = len(partial) - len(partial) % width
+            block.extend( partial[i : i + width] for i in range(0, whole, width) )
+            partial = partial[whole:]
+
+        self.__partial = partial
+        if len(block) == 0:
+            return
+
+        chars = len(text) - len(partial)
+        self.__blocks.append(block)
+        self.__block_chars.append(chars)
+        self.lines = self.lines + len(block)
+        self.chars = self.chars + chars
+
+        # discard whole blocks from the front, then trim the oldest remaining block
+        while self.lines - len(self.__blocks[0]) >= self.maxLines or self.chars - self.__block_chars[0] >= self.maxChars:
+            self.lines = self.lines - len(self.__blocks.popleft())
+            self.chars = self.chars - self.__block_chars.popleft()
+
+        first = self.__blocks[0]
+        count = max(self.lines - self.maxLines, 0)
+        removed = sum( len(line) for line in first[0:count] )
+        while self.chars - removed > self.maxChars and count < len(first) - 1:
+            removed = removed + len(first[count])
+            count = count + 1
+        if count:
+            del first[0:count]
+            self.__block_chars[0] = self.__block_chars[0] - removed
+            self.lines = self.lines - count
+            self.chars = self.chars - removed
+
+    def getLines(self, start, count):
+        """
+        This method returns 'count' lines from the store starting at line number 'start' (0 is the oldest line held).
+
+        PARAMETERS
+        ----------
+        start : int
+        Index of the first line to be returned
+
+        count : int
+        The number of lines to be returned
+
+        RETURNS : str
+        -------
+        The requested lines joined into a single string
+        """
+        result = []
+        pos = 0
+        for block in self.__blocks:
+            lt = len(block)
+            if pos + lt > start:
+                lo = max(start - pos, 0)
+                result.extend(block[lo : lo + count - len(result)])
+                if len(result) >= count:
+                    break
+            pos = pos + lt
+        if len(result) < count and start + len(result) == self.lines:
+            result.append(self.__partial)
+        return "".join(result)
+
+    def flush(self):
+        """
+        This method empties the store
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.__blocks.clear()
+        self.__block_chars.clear()
+        self.__partial = ""
+        self.lines = 0
+        self.chars = 0
 
 
 class buffer:
     """
-    This class is used to implement buffers
+    This class is used to implement buffers. The buffer is a fixed capacity ring built on a preallocated bytearray, so
+    enqueuing and dequeuing data never copies the bytes that remain in the buffer.
 
     Attributes
     ----------
@@ -93,8 +495,20 @@ class buffer:
     filled : int
     The number of data bytes in buffer
 
-    data : byte array
-    The actual data as byte array
+    data : bytearray
+    The preallocated storage of the ring
+
+    inPos : int
+    Index in data at which the next enqueued byte is written
+
+    outPos : int
+    Index in data from which the next byte is dequeued
+
+    dropped : int
+    The number of bytes refused by enqueue() because the buffer was full
+
+    highWater : int
+    The largest number of data bytes the buffer has held
 
     Methods
     -------
@@ -105,8 +519,17 @@ class buffer:
     dequeue()
     This method dequeues data from the buffer
 
+    dequeueInto()
+    This method dequeues data from the buffer directly into a caller provided writable buffer
+
+    peek()
+    This method returns views of the buffered data without dequeuing it
+
     flush()
     This method flushes the buffer
+
+    resetStats()
+    This method clears the drop counter and the high water mark
     
     """
 
@@ -127,7 +550,10 @@ class buffer:
         self.inPos = 0
         self.outPos = 0
         self.filled = 0
-        self.data = b''
+        self.dropped = 0
+        self.highWater = 0
+        self.data = bytearray(size)
+        self.__view = memoryview(self.data)
 
     def enqueue(self, bytSeq):
         """
@@ -147,11 +573,20 @@ class buffer:
         # Proceed only if there is sufficient space in the buffer to accomodate the byte sequence
         lt = len(bytSeq)
         if self.filled + lt <= self.maxSize:
-            self.data = self.data + bytSeq
-            self.filled = self.filled + lt
+            if lt:
+                # The byte sequence may wrap around the end of the storage, in which case it is copied in two parts
+                first = min(lt, self.maxSize - self.inPos)
+                self.__view[self.inPos : self.inPos + first] = bytSeq[0:first]
+                if first < lt:
+                    self.__view[0 : lt - first] = bytSeq[first:]
+                self.inPos = (self.inPos + lt) % self.maxSize
+                self.filled = self.filled + lt
+                if self.filled > self.highWater:
+                    self.highWater = self.filled
             return True
         # If there is not sufficient space in the buffer to accomonate the passed number of data bytes, return False
         else:
+            self.dropped = self.dropped + lt
             return False
     
     def dequeue(self, req):
@@ -172,13 +607,62 @@ class buffer:
             return b''
         # If the passed number data bytes are not avaialable in the buffer then raise an exception
         elif self.filled >= req:
-            st = self.data[0:req]
-            self.data = self.data[req:]
-            self.filled = self.filled - req
+            first, second = self.__views(req)
+            if len(second):
+                st = bytes(first) + second
+            else:
+                st = bytes(first)
+            self.__consume(req)
             return st
         # If data is not available to return then, raise an exception
         else:
             raise bufferException("Data unavailable")
+
+    def dequeueInto(self, buf):
+        """
+        This method is used to pop data bytes from the buffer straight into a writable buffer (bytearray, memoryview etc.)
+        provided by the caller; no intermediate byte string is created. As many bytes as are available, up to the
+        length of the passed buffer, are dequeued.
+
+        PARAMETERS
+        ----------
+        buf : writable bytes-like object
+        The buffer that receives the data bytes
+
+        RETURNS : int
+        -------
+        The number of data bytes written into buf
+        """
+        dst = memoryview(buf).cast('B')
+        req = min(len(dst), self.filled)
+        if req == 0:
+            return 0
+        first, second = self.__views(req)
+        lt = len(first)
+        dst[0:lt] = first
+        if len(second):
+            dst[lt:req] = second
+        self.__consume(req)
+        return req
+
+    def peek(self, req=None):
+        """
+        This method returns the oldest data bytes in the buffer without dequeuing them. The data is returned as two
+        memoryviews into the storage of the buffer (the second one is empty unless the data wraps around the end of the
+        storage). The views must not be used after the buffer is modified.
+
+        PARAMETERS
+        ----------
+        req : int
+        The number of data bytes to peek at; all the buffered bytes if not provided
+
+        RETURNS : tuple
+        -------
+        ( memoryview, memoryview ) which together hold the requested bytes in order
+        """
+        if req is None or req > self.filled:
+            req = self.filled
+        return self.__views(req)
     
     def flush(self):
         """
@@ -192,9 +676,243 @@ class buffer:
         -------
         NOTHING
         """
-        self.data=b''
+        self.inPos=0
+        self.outPos=0
         self.filled=0
 
+    def resetStats(self):
+        """
+        This method clears the drop counter and the high water mark
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.dropped = 0
+        self.highWater = self.filled
+
+    def __views(self, req):
+        """
+        This private method returns the memoryviews covering the oldest 'req' data bytes in the buffer
+
+        PARAMETERS
+        ----------
+        req : int
+        The number of data bytes to be covered; must not exceed the number of bytes in the buffer
+
+        RETURNS : tuple
+        -------
+        ( memoryview, memoryview ) which together hold the requested bytes in order
+        """
+        first = min(req, self.maxSize - self.outPos)
+        return ( self.__view[self.outPos : self.outPos + first], self.__view[0 : req - first] )
+
+    def __consume(self, req):
+        """
+        This private method discards the oldest 'req' data bytes from the buffer
+
+        PARAMETERS
+        ----------
+        req : int
+        The number of data bytes to be discarded
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.outPos = (self.outPos + req) % self.maxSize
+        self.filled = self.filled - req
+
+
+class spscQueue(buffer):
+    """
+    This class implements a thread safe single producer / single consumer queue on top of the ring buffer. One thread
+    enqueues and one thread dequeues; the ring storage and the fill count are always updated together under the queue
+    lock, so a consumer never observes a fill count that does not match the bytes in the storage. Threads can block on
+    the queue until data or space is available instead of polling it.
+
+    Methods
+    -------
+
+    waitForData()
+    This method blocks the calling thread until the queue holds data
+
+    waitForSpace()
+    This method blocks the calling thread until the queue can accomodate a number of bytes
+    """
+
+    def __init__(self, size):
+        """
+        The class constructor
+
+        PARAMETERS
+        ----------
+        size : int
+        Maximum size of the queue
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        super().__init__(size)
+        self.lock = threading.Lock()
+        self.__data_available = threading.Condition(self.lock)
+        self.__space_available = threading.Condition(self.lock)
+        self.__notifier = None
+
+    def setNotifier(self, notifier):
+        """
+        This method registers a function that is invoked (outside the queue lock) every time data is enqueued. It lets a
+        consumer that sleeps on something other than the queue, e.g. a file descriptor, be woken up by the producer.
+
+        PARAMETERS
+        ----------
+        notifier : function
+        A function that takes no arguments; None removes the registered function
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        self.__notifier = notifier
+
+    def enqueue(self, bytSeq):
+        """
+        This method is used to push bytes into the queue; the waiting consumer is woken up once the bytes are published.
+
+        PARAMETERS
+        ----------
+        bytSeq : byte array
+        The byte sequence to push into the queue
+
+        RETURNS : bool
+        -------
+        True : data is enqueued successfully
+        False : not sufficient space in the queue to hold the passed number of data bytes
+        """
+        with self.lock:
+            status = super().enqueue(bytSeq)
+            if status and len(bytSeq):
+                self.__data_available.notify()
+            else:
+                return status
+        notifier = self.__notifier
+        if not notifier == None:
+            notifier()
+        return status
+
+    def dequeue(self, req):
+        """
+        This method is used to pop data bytes from the queue; the waiting producer is woken up once space is released.
+
+        PARAMETERS
+        ----------
+        req : int
+        The number of data bytes to be dequeued
+
+        RETURNS : byte array
+        -------
+        The dequeued byte string
+        """
+        with self.lock:
+            st = super().dequeue(req)
+            if req:
+                self.__space_available.notify()
+            return st
+
+    def dequeueInto(self, buf):
+        """
+        This method is used to pop data bytes from the queue straight into a writable buffer provided by the caller.
+
+        PARAMETERS
+        ----------
+        buf : writable bytes-like object
+        The buffer that receives the data bytes
+
+        RETURNS : int
+        -------
+        The number of data bytes written into buf
+        """
+        with self.lock:
+            count = super().dequeueInto(buf)
+            if count:
+                self.__space_available.notify()
+            return count
+
+    def peek(self, req=None):
+        """
+        This method returns the oldest data bytes in the queue without dequeuing them. It must only be called from the
+        consumer thread; the producer never writes into the region covered by the returned views.
+
+        PARAMETERS
+        ----------
+        req : int
+        The number of data bytes to peek at; all the queued bytes if not provided
+
+        RETURNS : tuple
+        -------
+        ( memoryview, memoryview ) which together hold the requested bytes in order
+        """
+        with self.lock:
+            return super().peek(req)
+
+    def flush(self):
+        """
+        This method is used to flush the queue
+
+        PARAMETERS
+        ----------
+        NONE
+
+        RETURNS
+        -------
+        NOTHING
+        """
+        with self.lock:
+            super().flush()
+            self.__space_available.notify_all()
+
+    def waitForData(self, timeout=None):
+        """
+        This method blocks the calling thread until there is at least one byte in the queue or the timeout expires.
+
+        PARAMETERS
+        ----------
+        timeout : float
+        Maximum time to wait in seconds; wait indefinitely if None
+
+        RETURNS : bool
+        -------
+        True : data is available in the queue
+        False : the timeout expired before data became available
+        """
+        with self.lock:
+            return self.__data_available.wait_for(lambda: self.filled > 0, timeout)
+
+    def waitForSpace(self, timeout=None, req=1):
+        """
+        This method blocks the calling thread until the queue can accomodate 'req' more bytes or the timeout expires.
+
+        PARAMETERS
+        ----------
+        timeout : float
+        Maximum time to wait in seconds; wait indefinitely if None
+
+        req : int
+        The number of bytes the caller wants to enqueue
+
+        RETURNS : bool
+        -------
+        True : space is available in the queue
+        False : the timeout expired before space became available
+        """
+        with self.lock:
+            return self.__space_available.wait_for(lambda: self.maxSize - self.filled >= req, timeout)
+
 
 class bufferException(Exception):
     """
@@ -0,0 +1,116 @@
+"""
+Tests of the recording container of utility/record_utility.py.
+
+    python -m unittest discover tests
+"""
+
+__author__ = "ASHUTOSH SINGH PARMAR"
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src'))
+
+from utility import record_utility
+
+# time of the first record of the test recordings, and the time between two records, in nanoseconds
+first_stamp = 5000000000
+record_gap = 1000000
+
+class recordingTest(unittest.TestCase):
+    """
+    This class writes recording containers with recordingWriter and reads them back with recordingReader.
+    """
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp(prefix='terman_test_')
+        self.file_name = os.path.join(self.directory, 'session' + record_utility.recording_extension)
+
+        # alternating received and sent chunks of varying length, one every record_gap, indexed every 10 records
+        self.records = []
+        writer = record_utility.recordingWriter(self.file_name, index_interval=10 * record_gap / 1e9, buffer_size=4096,
+                                                flush_size=1024)
+        for i in range(1000):
+            direction = record_utility.RX if i % 2 == 0 else record_utility.TX
+            payload = bytes([i % 256]) * (i % 13)
+            writer.write(first_stamp + i * record_gap, direction, payload)
+            self.records.append( (i * record_gap, direction, payload) )
+        writer.close()
+        self.writer = writer
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def readAll(self, reader, direction=None):
+        """
+        This method returns the remaining records of a reader, with their payloads copied.
+        """
+        records = []
+        while True:
+            record = reader.next(direction)
+            if record == None:
+                return records
+            records.append( (record[0], record[1], bytes(record[2])) )
+
+    def test_file_names(self):
+        self.assertEqual(record_utility.recordingFileName('/a/b.bin'), '/a/b.trm')
+        self.assertEqual(record_utility.indexFileName('/a/b.trm'), '/a/b.tri')
+
+    def test_round_trip(self):
+        reader = record_utility.recordingReader(self.file_name)
+        self.assertEqual(self.readAll(reader), self.records)
+        reader.close()
+
+        reader = record_utility.recordingReader(self.file_name)
+        received = [ record for record in self.records if record[1] == record_utility.RX ]
+        self.assertEqual(self.readAll(reader, record_utility.RX), received)
+        reader.close()
+
+    def test_index(self):
+        # an entry for the first record and then for the first record of every 10 records
+        size = os.path.getsize(record_utility.indexFileName(self.file_name))
+        self.assertEqual(size, 100 * record_utility.index_entry.size)
+        self.assertEqual(self.writer.size, os.path.getsize(self.file_name))
+
+    def test_seek(self):
+        reader = record_utility.recordingReader(self.file_name)
+        for position in (0, 1, record_gap, 15 * record_gap + 1, 500 * record_gap, 999 * record_gap):
+            reader.seek(position)
+            expected = [ record for record in self.records if record[0] >= position ]
+            self.assertEqual(self.readAll(reader)[0:3], expected[0:3])
+
+        reader.seek(999 * record_gap + 1)
+        self.assertEqual(reader.next(), None)
+        reader.close()
+
+    def test_seek_without_index(self):
+        os.remove(record_utility.indexFileName(self.file_name))
+        reader = record_utility.recordingReader(self.file_name)
+        reader.seek(333 * record_gap)
+        self.assertEqual(self.readAll(reader), self.records[333:])
+        reader.close()
+
+    def test_truncated(self):
+        # a recording cut short in the middle of its last record is readable up to the record before it
+        with open(self.file_name, 'r+b') as fl:
+            fl.truncate(os.path.getsize(self.file_name) - 3)
+        reader = record_utility.recordingReader(self.file_name)
+        self.assertEqual(self.readAll(reader), self.records[0:-1])
+        reader.close()
+
+    def test_not_a_recording(self):
+        name = os.path.join(self.directory, 'other.trm')
+        with open(name, 'wb') as fl:
+            fl.write(b'\x00' * 64)
+        with self.assertRaises(ValueError):
+            record_utility.recordingReader(name)
+
+    def test_write_after_close(self):
+        with self.assertRaises(ValueError):
+            self.writer.write(first_stamp + 1000 * record_gap, record_utility.RX, b'late')
+
+if __name__ == "__main__":
+    unittest.main()
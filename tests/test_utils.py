@@ -0,0 +1,108 @@
+"""
+Tests of the ring buffer of utility/utils.py.
+
+    python -m unittest discover tests
+"""
+
+__author__ = "ASHUTOSH SINGH PARMAR"
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'src'))
+
+from utility import utils
+
+class bufferTest(unittest.TestCase):
+    """
+    This class tests utils.buffer, in particular data that wraps around the end of its storage.
+    """
+
+    def wrapped(self):
+        """
+        This method returns a buffer of 8 bytes holding b'efghij', which wraps around the end of the storage.
+        """
+        buff = utils.buffer(8)
+        self.assertTrue(buff.enqueue(b'abcdef'))
+        self.assertEqual(buff.dequeue(4), b'abcd')
+        self.assertTrue(buff.enqueue(b'ghij'))
+        return buff
+
+    def test_wraparound(self):
+        buff = self.wrapped()
+        self.assertEqual(buff.filled, 6)
+        self.assertEqual(buff.inPos, 2)
+        self.assertEqual(buff.dequeue(6), b'efghij')
+        self.assertEqual(buff.filled, 0)
+
+        # the ring keeps the order of the bytes over many turns
+        sent = bytearray()
+        received = bytearray()
+        for i in range(100):
+            chunk = bytes([i]) * (i % 7 + 1)
+            self.assertTrue(buff.enqueue(chunk))
+            sent += chunk
+            # one byte is left behind, so that the following chunks start at every position of the storage
+            received += buff.dequeue(buff.filled - 1)
+        received += buff.dequeue(buff.filled)
+        self.assertEqual(received, sent)
+
+    def test_full(self):
+        buff = self.wrapped()
+        self.assertFalse(buff.enqueue(b'xyz'))
+        self.assertEqual(buff.dropped, 3)
+        self.assertEqual(buff.highWater, 6)
+        self.assertTrue(buff.enqueue(b'kl'))
+        self.assertEqual(buff.highWater, 8)
+        self.assertEqual(buff.dequeue(8), b'efghijkl')
+
+        buff.resetStats()
+        self.assertEqual(buff.dropped, 0)
+        self.assertEqual(buff.highWater, 0)
+
+    def test_dequeue(self):
+        buff = self.wrapped()
+        self.assertEqual(buff.dequeue(0), b'')
+        with self.assertRaises(utils.bufferException):
+            buff.dequeue(7)
+        self.assertEqual(buff.filled, 6)
+
+    def test_dequeueInto(self):
+        buff = self.wrapped()
+
+        # a destination smaller than the buffered data takes its length, across the end of the storage
+        dst = bytearray(5)
+        self.assertEqual(buff.dequeueInto(dst), 5)
+        self.assertEqual(dst, b'efghi')
+        self.assertEqual(buff.filled, 1)
+
+        # a larger destination takes what is available
+        dst = bytearray(4)
+        self.assertEqual(buff.dequeueInto(memoryview(dst)[1:]), 1)
+        self.assertEqual(dst, b'\x00j\x00\x00')
+        self.assertEqual(buff.dequeueInto(dst), 0)
+
+    def test_peek(self):
+        buff = self.wrapped()
+        first, second = buff.peek()
+        self.assertEqual(bytes(first), b'efgh')
+        self.assertEqual(bytes(second), b'ij')
+        self.assertEqual(buff.filled, 6)
+
+        first, second = buff.peek(3)
+        self.assertEqual(bytes(first) + bytes(second), b'efg')
+        first, second = buff.peek(100)
+        self.assertEqual(bytes(first) + bytes(second), b'efghij')
+        self.assertEqual(buff.dequeue(6), b'efghij')
+
+    def test_flush(self):
+        buff = self.wrapped()
+        buff.flush()
+        self.assertEqual(buff.filled, 0)
+        self.assertEqual(buff.peek(), (b'', b''))
+        self.assertTrue(buff.enqueue(b'12345678'))
+        self.assertEqual(buff.dequeue(8), b'12345678')
+
+if __name__ == "__main__":
+    unittest.main()